@@ -3,120 +3,218 @@ import pandas as pd
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import DBSCAN
+import joblib
+import os
+import socket
+import zlib
 from datetime import datetime, timedelta
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 import asyncio
+from collections import Counter, deque
+import logging
+import threading
 from config import Config
 
+logger = logging.getLogger(__name__)
+
 class AnomalyDetector:
+    # Severity encoding shared by all feature extraction calls
+    _SEV_MAP = {"INFO": 0, "WARNING": 1, "ERROR": 2, "CRITICAL": 3}
+    
+    # hour, weekday, minute, severity, service, message length, 4 IP octets, user
+    N_FEATURES = 11
+    
+    # Bump whenever extract_features changes so cached models are not reused
+    FEATURE_SCHEMA_VERSION = 2
+    
+    # Every detector needs at least this many logs before it can flag anything
+    MIN_LOGS_FOR_DETECTION = 10
+
     def __init__(self):
         self.isolation_forest = IsolationForest(
             contamination=0.1,  # Expect 10% anomalies
             random_state=42
         )
-        self.scaler = StandardScaler()
+        # Scale the float32 feature matrix in place; IsolationForest consumes
+        # float32 natively, so no float64 copy is made along the way
+        self.scaler = StandardScaler(copy=False)
         self.dbscan = DBSCAN(eps=0.5, min_samples=5)
         self.is_fitted = False
         
         # Historical data for baseline
-        self.historical_data = []
+        # Keep only recent data (last 1000 logs); older entries fall off the left
+        self.historical_data = deque(maxlen=1000)
         self.baseline_stats = {}
+        
+        # Detection runs in worker threads; batches still go through one at a
+        # time since the scaler and forest are updated in place
+        self._detect_lock = threading.Lock()
+        
+        # Reuse a previously fitted model so restarts skip the cold-start fit
+        self._load_model()
 
-    def extract_features(self, logs: List[Dict]) -> np.ndarray:
-        """Extract numerical features from logs for anomaly detection"""
-        features = []
+    def _feature_schema(self) -> str:
+        """Fingerprint of the feature layout a cached model was trained on"""
+        return f"v{self.FEATURE_SCHEMA_VERSION}:{self.N_FEATURES}"
+
+    def _load_model(self):
+        """Load the fitted scaler and Isolation Forest from the model cache, if compatible"""
+        path = Config.IFOREST_CACHE_PATH
+        if not path or not os.path.exists(path):
+            return
         
-        for log in logs:
-            feature_vector = []
-            
-            # Time-based features
-            timestamp = datetime.fromisoformat(log["timestamp"])
-            feature_vector.extend([
-                timestamp.hour,  # Hour of day
-                timestamp.weekday(),  # Day of week
-                timestamp.minute,  # Minute of hour
-            ])
-            
-            # Severity encoding
-            severity_map = {"INFO": 0, "WARNING": 1, "ERROR": 2, "CRITICAL": 3}
-            feature_vector.append(severity_map.get(log["severity"], 0))
-            
-            # Service encoding (simple hash)
-            service_hash = hash(log["service"]) % 100
-            feature_vector.append(service_hash)
-            
-            # Message length
-            feature_vector.append(len(log["message"]))
-            
-            # IP address features (if available)
-            if log.get("source_ip"):
-                ip_parts = log["source_ip"].split(".")
-                if len(ip_parts) == 4:
-                    feature_vector.extend([int(part) for part in ip_parts])
-                else:
-                    feature_vector.extend([0, 0, 0, 0])
-            else:
-                feature_vector.extend([0, 0, 0, 0])
-            
-            # User ID features (if available)
-            if log.get("user_id"):
-                user_hash = hash(log["user_id"]) % 1000
-                feature_vector.append(user_hash)
-            else:
-                feature_vector.append(0)
+        try:
+            cached = joblib.load(path)
+            if cached.get("schema") != self._feature_schema():
+                logger.info("Cached anomaly model has an outdated feature schema, ignoring it")
+                return
             
-            features.append(feature_vector)
+            self.scaler = cached["scaler"]
+            self.isolation_forest = cached["isolation_forest"]
+            self.is_fitted = True
+        except Exception:
+            logger.exception("Error loading cached anomaly model")
+
+    def _save_model(self):
+        """Persist the fitted scaler and Isolation Forest to the model cache"""
+        path = Config.IFOREST_CACHE_PATH
+        if not path:
+            return
         
-        return np.array(features)
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            joblib.dump({
+                "schema": self._feature_schema(),
+                "scaler": self.scaler,
+                "isolation_forest": self.isolation_forest
+            }, path, compress=3)
+        except Exception:
+            logger.exception("Error saving anomaly model cache")
+
+    @staticmethod
+    def _parse_timestamps(logs: List[Dict]) -> pd.DatetimeIndex:
+        """Parse all log timestamps as naive wall-clock times, dropping any UTC offset
+        (as datetime.fromisoformat(...).replace(tzinfo=None) would)"""
+        values = [log["timestamp"] for log in logs]
+        try:
+            timestamps = pd.to_datetime(values, format="ISO8601", cache=True)
+        except ValueError:
+            # Offsets differ between logs, so no single vectorized parse keeps wall-clock times
+            return pd.DatetimeIndex([datetime.fromisoformat(value).replace(tzinfo=None) for value in values])
+        return timestamps.tz_localize(None) if timestamps.tz is not None else timestamps
+
+    def extract_features(self, logs: List[Dict], timestamps: Optional[pd.DatetimeIndex] = None) -> np.ndarray:
+        """Extract numerical features from logs for anomaly detection"""
+        features = np.zeros((len(logs), self.N_FEATURES), dtype=np.float32)
+        if not logs:
+            return features
+        
+        # Time-based features (hour of day, day of week, minute of hour)
+        if timestamps is None:
+            timestamps = self._parse_timestamps(logs)
+        features[:, 0] = timestamps.hour
+        features[:, 1] = timestamps.weekday
+        features[:, 2] = timestamps.minute
+        
+        # Severity encoding
+        sev_map = self._SEV_MAP
+        features[:, 3] = np.fromiter((sev_map.get(log["severity"], 0) for log in logs), dtype=np.int8, count=len(logs))
+        
+        # Service encoding (stable hash)
+        features[:, 4] = self._hash_codes([log["service"] for log in logs], 100)
+        
+        # Message length
+        features[:, 5] = np.fromiter((len(log["message"]) for log in logs), dtype=np.int32, count=len(logs))
+        
+        # IP address features (if available)
+        packed = b"".join(self._packed_ip(log.get("source_ip")) for log in logs)
+        features[:, 6:10] = np.frombuffer(packed, dtype=np.uint8).reshape(-1, 4)
+        
+        # User ID features (if available)
+        features[:, 10] = self._hash_codes([log.get("user_id") for log in logs], 1000)
+        
+        return features
+
+    @staticmethod
+    def _hash_codes(values: List[Optional[str]], modulo: int) -> np.ndarray:
+        """Hash each distinct value once and map the codes back onto every row (missing -> 0)
 
-    def detect_volume_anomalies(self, logs: List[Dict], window_minutes: int = 60) -> List[Dict]:
+        CRC32 is used instead of hash() because str hashes are salted per process,
+        which would silently change the features a cached model was trained on.
+        """
+        codes, uniques = pd.factorize(np.array(values, dtype=object))
+        # Trailing zero slot is picked up by factorize's -1 code for missing values
+        lookup = np.zeros(len(uniques) + 1, dtype=np.int16)
+        lookup[:-1] = [zlib.crc32(str(value).encode("utf-8")) % modulo for value in uniques]
+        return lookup[codes]
+
+    @staticmethod
+    def _packed_ip(source_ip: Optional[str]) -> bytes:
+        """Pack a dotted IPv4 address into its 4 octet bytes, or zeros if unavailable"""
+        if source_ip:
+            try:
+                return socket.inet_pton(socket.AF_INET, source_ip)
+            except OSError:
+                pass
+        return b"\x00\x00\x00\x00"
+
+    def detect_volume_anomalies(self, logs: List[Dict], window_minutes: int = 60,
+                                timestamps: Optional[pd.DatetimeIndex] = None) -> List[Dict]:
         """Detect anomalies in log volume patterns"""
         anomalies = []
         
-        if len(logs) < 10:  # Need minimum data for analysis
+        if len(logs) < self.MIN_LOGS_FOR_DETECTION:  # Need minimum data for analysis
             return anomalies
         
-        # Group logs by time windows
-        time_windows = {}
-        for log in logs:
-            timestamp = datetime.fromisoformat(log["timestamp"])
-            window_key = timestamp.replace(minute=0, second=0, microsecond=0)
-            if window_key not in time_windows:
-                time_windows[window_key] = []
-            time_windows[window_key].append(log)
-        
-        # Calculate volume statistics
-        volumes = [len(window_logs) for window_logs in time_windows.values()]
+        if timestamps is None:
+            timestamps = self._parse_timestamps(logs)
+        
+        # Count logs per hourly window
+        hour_buckets = timestamps.values.astype("datetime64[h]").astype(np.int64)
+        window_keys, volumes = np.unique(hour_buckets, return_counts=True)
         if len(volumes) < 3:
             return anomalies
         
-        mean_volume = np.mean(volumes)
-        std_volume = np.std(volumes)
+        mean_volume = float(volumes.mean())
+        std_volume = float(volumes.std())
+        if std_volume == 0:
+            return anomalies
         
         # Detect volume spikes
-        for window_time, window_logs in time_windows.items():
-            volume = len(window_logs)
-            z_score = (volume - mean_volume) / std_volume if std_volume > 0 else 0
-            
-            if z_score > 2.5:  # Volume spike threshold
-                anomalies.append({
-                    "type": "volume_spike",
-                    "timestamp": window_time.isoformat(),
-                    "severity": "WARNING",
-                    "description": f"Log volume spike detected: {volume} logs (normal: {mean_volume:.1f} ± {std_volume:.1f})",
-                    "confidence_score": min(z_score / 5.0, 1.0),
-                    "affected_service": "multiple",
-                    "metadata": {
-                        "volume": volume,
-                        "mean_volume": mean_volume,
-                        "std_volume": std_volume,
-                        "z_score": z_score
-                    }
-                })
+        z_scores = (volumes - mean_volume) / std_volume
+        spikes = np.flatnonzero(z_scores > 2.5)  # Volume spike threshold
+        window_times = pd.to_datetime(window_keys[spikes], unit="h")
+        for window_time, idx in zip(window_times, spikes):
+            volume = int(volumes[idx])
+            z_score = float(z_scores[idx])
+            anomalies.append({
+                "type": "volume_spike",
+                "timestamp": window_time.isoformat(),
+                "severity": "WARNING",
+                "description": f"Log volume spike detected: {volume} logs (normal: {mean_volume:.1f} ± {std_volume:.1f})",
+                "confidence_score": min(z_score / 5.0, 1.0),
+                "affected_service": "multiple",
+                "metadata": {
+                    "volume": volume,
+                    "mean_volume": mean_volume,
+                    "std_volume": std_volume,
+                    "z_score": z_score
+                }
+            })
         
         return anomalies
 
-    def detect_severity_anomalies(self, logs: List[Dict]) -> List[Dict]:
+    def _severity_matrix(self, logs: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """Count logs per (service, severity) pair in one vectorized pass"""
+        sev_map = self._SEV_MAP
+        sev_idx = np.fromiter((sev_map.get(log["severity"], 0) for log in logs), dtype=np.int64, count=len(logs))
+        svc_codes, services = pd.factorize(np.array([log["service"] for log in logs], dtype=object))
+        n_sev = len(sev_map)
+        counts = np.bincount(svc_codes * n_sev + sev_idx, minlength=len(services) * n_sev)
+        return services, counts.reshape(len(services), n_sev)
+
+    def detect_severity_anomalies(self, logs: List[Dict],
+                                  severity_matrix: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> List[Dict]:
         """Detect anomalies in severity patterns"""
         anomalies = []
         
@@ -124,16 +222,17 @@ class AnomalyDetector:
             return anomalies
         
         # Count severities
-        severity_counts = {}
-        for log in logs:
-            severity = log["severity"]
-            severity_counts[severity] = severity_counts.get(severity, 0) + 1
+        if severity_matrix is None:
+            severity_matrix = self._severity_matrix(logs)
+        severity_totals = severity_matrix[1].sum(axis=0)
+        error_count = int(severity_totals[self._SEV_MAP["ERROR"]])
+        critical_count = int(severity_totals[self._SEV_MAP["CRITICAL"]])
         
         total_logs = len(logs)
         
         # Check for unusual error rates
-        error_rate = severity_counts.get("ERROR", 0) / total_logs
-        critical_rate = severity_counts.get("CRITICAL", 0) / total_logs
+        error_rate = error_count / total_logs
+        critical_rate = critical_count / total_logs
         
         # Expected rates based on configuration
         expected_error_rate = Config.SEVERITY_WEIGHTS.get("ERROR", 0.12)
@@ -150,7 +249,7 @@ class AnomalyDetector:
                 "metadata": {
                     "error_rate": error_rate,
                     "expected_error_rate": expected_error_rate,
-                    "error_count": severity_counts.get("ERROR", 0),
+                    "error_count": error_count,
                     "total_logs": total_logs
                 }
             })
@@ -166,40 +265,42 @@ class AnomalyDetector:
                 "metadata": {
                     "critical_rate": critical_rate,
                     "expected_critical_rate": expected_critical_rate,
-                    "critical_count": severity_counts.get("CRITICAL", 0),
+                    "critical_count": critical_count,
                     "total_logs": total_logs
                 }
             })
         
         return anomalies
 
-    def detect_service_anomalies(self, logs: List[Dict]) -> List[Dict]:
+    def detect_service_anomalies(self, logs: List[Dict],
+                                 severity_matrix: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> List[Dict]:
         """Detect anomalies in service-specific patterns"""
         anomalies = []
         
         if len(logs) < 20:
             return anomalies
         
-        # Group logs by service
-        service_logs = {}
-        for log in logs:
-            service = log["service"]
-            if service not in service_logs:
-                service_logs[service] = []
-            service_logs[service].append(log)
-        
-        # Analyze each service
-        for service, service_log_list in service_logs.items():
-            if len(service_log_list) < 5:
-                continue
-            
-            # Check for service-specific error patterns
-            error_count = sum(1 for log in service_log_list if log["severity"] == "ERROR")
-            critical_count = sum(1 for log in service_log_list if log["severity"] == "CRITICAL")
-            
-            total_service_logs = len(service_log_list)
-            service_error_rate = error_count / total_service_logs
-            service_critical_rate = critical_count / total_service_logs
+        # Per-service severity counts and rates
+        if severity_matrix is None:
+            severity_matrix = self._severity_matrix(logs)
+        services, counts = severity_matrix
+        service_totals = counts.sum(axis=1)
+        error_counts = counts[:, self._SEV_MAP["ERROR"]]
+        critical_counts = counts[:, self._SEV_MAP["CRITICAL"]]
+        error_rates = error_counts / service_totals
+        critical_rates = critical_counts / service_totals
+        
+        # Only services with enough volume and a rate over either threshold need a closer look
+        flagged = (service_totals >= 5) & ((error_rates > 0.3) | (critical_rates > 0.1))
+        
+        # Analyze each flagged service
+        for i in np.flatnonzero(flagged):
+            service = services[i]
+            error_count = int(error_counts[i])
+            critical_count = int(critical_counts[i])
+            total_service_logs = int(service_totals[i])
+            service_error_rate = float(error_rates[i])
+            service_critical_rate = float(critical_rates[i])
             
             # Service-specific thresholds
             if service_error_rate > 0.3:  # 30% error rate for a service
@@ -236,7 +337,7 @@ class AnomalyDetector:
         
         return anomalies
 
-    def detect_pattern_anomalies(self, logs: List[Dict]) -> List[Dict]:
+    def detect_pattern_anomalies(self, logs: List[Dict], timestamps: Optional[pd.DatetimeIndex] = None) -> List[Dict]:
         """Detect anomalies using machine learning patterns"""
         anomalies = []
         
@@ -245,19 +346,25 @@ class AnomalyDetector:
         
         try:
             # Extract features
-            features = self.extract_features(logs)
+            features = self.extract_features(logs, timestamps)
             
-            # Standardize features
-            features_scaled = self.scaler.fit_transform(features)
+            # Standardize features against running statistics so the fitted
+            # forest keeps seeing the same feature space across batches
+            self.scaler.partial_fit(features)
+            features_scaled = self.scaler.transform(features)
             
             # Fit isolation forest if not already fitted
             if not self.is_fitted:
                 self.isolation_forest.fit(features_scaled)
                 self.is_fitted = True
+                self._save_model()
             
-            # Predict anomalies
-            anomaly_scores = self.isolation_forest.decision_function(features_scaled)
-            anomaly_predictions = self.isolation_forest.predict(features_scaled)
+            # Predict anomalies, scoring each distinct feature row only once since
+            # repeated logs from the same service/user/IP in a minute are common
+            unique_rows, inverse = np.unique(features_scaled, axis=0, return_inverse=True)
+            anomaly_scores = self.isolation_forest.decision_function(unique_rows)[inverse.reshape(-1)]
+            # Same rule IsolationForest.predict applies to decision_function
+            anomaly_predictions = np.where(anomaly_scores < 0, -1, 1)
             
             # Identify anomalous logs
             for i, (log, score, prediction) in enumerate(zip(logs, anomaly_scores, anomaly_predictions)):
@@ -279,24 +386,34 @@ class AnomalyDetector:
                         }
                     })
         
-        except Exception as e:
-            print(f"Error in pattern anomaly detection: {e}")
+        except Exception:
+            logger.exception("Error in pattern anomaly detection")
         
         return anomalies
 
     async def detect_anomalies(self, logs: List[Dict]) -> List[Dict]:
         """Main anomaly detection method that combines all detection techniques"""
-        all_anomalies = []
+        if len(logs) < self.MIN_LOGS_FOR_DETECTION:
+            return []
         
-        if not logs:
-            return all_anomalies
+        # Detection is CPU-bound, so keep it off the event loop
+        return await asyncio.to_thread(self._detect_anomalies_impl, logs)
+
+    def _detect_anomalies_impl(self, logs: List[Dict]) -> List[Dict]:
+        """Run all detection techniques synchronously and filter by confidence"""
+        all_anomalies = []
         
         try:
+            # Parse timestamps and count severities once and share them between detectors
+            timestamps = self._parse_timestamps(logs)
+            severity_matrix = self._severity_matrix(logs)
+            
             # Run different anomaly detection methods
-            volume_anomalies = self.detect_volume_anomalies(logs)
-            severity_anomalies = self.detect_severity_anomalies(logs)
-            service_anomalies = self.detect_service_anomalies(logs)
-            pattern_anomalies = self.detect_pattern_anomalies(logs)
+            with self._detect_lock:
+                volume_anomalies = self.detect_volume_anomalies(logs, timestamps=timestamps)
+                severity_anomalies = self.detect_severity_anomalies(logs, severity_matrix=severity_matrix)
+                service_anomalies = self.detect_service_anomalies(logs, severity_matrix=severity_matrix)
+                pattern_anomalies = self.detect_pattern_anomalies(logs, timestamps=timestamps)
             
             # Combine all anomalies
             all_anomalies.extend(volume_anomalies)
@@ -312,8 +429,8 @@ class AnomalyDetector:
             
             return filtered_anomalies
             
-        except Exception as e:
-            print(f"Error in anomaly detection: {e}")
+        except Exception:
+            logger.exception("Error in anomaly detection")
             return []
 
     def update_baseline(self, logs: List[Dict]):
@@ -322,17 +439,10 @@ class AnomalyDetector:
             # Add to historical data
             self.historical_data.extend(logs)
             
-            # Keep only recent data (last 1000 logs)
-            if len(self.historical_data) > 1000:
-                self.historical_data = self.historical_data[-1000:]
-            
             # Update baseline statistics
             if len(self.historical_data) >= 100:
                 # Calculate baseline severity distribution
-                severity_counts = {}
-                for log in self.historical_data:
-                    severity = log["severity"]
-                    severity_counts[severity] = severity_counts.get(severity, 0) + 1
+                severity_counts = Counter(log["severity"] for log in self.historical_data)
                 
                 total = len(self.historical_data)
                 self.baseline_stats = {
@@ -340,8 +450,8 @@ class AnomalyDetector:
                     for severity, count in severity_counts.items()
                 }
                 
-        except Exception as e:
-            print(f"Error updating baseline: {e}")
+        except Exception:
+            logger.exception("Error updating baseline")
 
 
 
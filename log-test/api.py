@@ -1,15 +1,25 @@
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from pydantic import BaseModel, ConfigDict, ValidationError
 from typing import List, Dict, Optional
-from datetime import datetime, timedelta
-import json
+from datetime import datetime, timedelta, timezone
 import asyncio
-from database import get_db, LogEntry, create_tables
+from collections import Counter
+import functools
+import logging
+from database import get_async_db, LogEntry, create_tables
 from config import Config
 from anomaly_detector import AnomalyDetector
-from telegram_alerter import TelegramAlerter
+from telegram_alerter import TelegramAlerter, close_shared_session
+from logging_setup import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # Create FastAPI app
 app = FastAPI(
@@ -27,12 +37,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses (log listings, stats) for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 # Initialize services
 anomaly_detector = AnomalyDetector()
 telegram_alerter = TelegramAlerter()
 
+@functools.lru_cache(maxsize=4096)
+def _parse_iso(value: str) -> datetime:
+    """Parse an ISO timestamp as an aware UTC datetime, reading naive values as UTC;
+    logs from one upstream clock tick share the same string"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
 # Pydantic models
 class LogEntryRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     timestamp: Optional[str] = None
     service: str
     severity: str
@@ -43,79 +67,119 @@ class LogEntryRequest(BaseModel):
     metadata: Optional[Dict] = None
 
 class LogBatchRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     logs: List[LogEntryRequest]
 
 class LogResponse(BaseModel):
-    id: int
-    timestamp: str
-    service: str
-    severity: str
-    message: str
-    source_ip: Optional[str]
-    user_id: Optional[str]
-    request_id: Optional[str]
-    metadata: Dict
+    # Fields default to None so /api/logs can return a projection; fields
+    # that were never set are left out of the response
+    id: Optional[int] = None
+    timestamp: Optional[str] = None
+    service: Optional[str] = None
+    severity: Optional[str] = None
+    message: Optional[str] = None
+    source_ip: Optional[str] = None
+    user_id: Optional[str] = None
+    request_id: Optional[str] = None
+    metadata: Optional[Dict] = None
 
 # Startup event
 @app.on_event("startup")
 async def startup_event():
     """Initialize database and services on startup"""
     create_tables()
-    print("Database tables created")
-    print("LogOps Analyzer API started")
+    logger.info("Database tables created")
+    logger.info("LogOps Analyzer API started")
+
+# Shutdown event
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Send pending alerts and release the Telegram connection pool"""
+    await telegram_alerter.close()
+    await close_shared_session()
 
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
+    return {"status": "healthy", "timestamp": datetime.now(timezone.utc).isoformat()}
+
+# /api/logs parses its body by hand, so its schema is declared for /docs here;
+# LogEntryRequest itself is published under components by /api/log
+LOG_BATCH_SCHEMA = LogBatchRequest.model_json_schema(ref_template="#/components/schemas/{model}")
+LOG_BATCH_SCHEMA.pop("$defs", None)
 
 # Log ingestion endpoint
-@app.post("/api/logs", response_model=Dict)
+@app.post(
+    "/api/logs",
+    response_model=Dict,
+    openapi_extra={
+        "requestBody": {
+            "content": {"application/json": {"schema": LOG_BATCH_SCHEMA}},
+            "required": True
+        }
+    }
+)
 async def ingest_logs(
-    log_batch: LogBatchRequest,
+    request: Request,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Ingest a batch of logs"""
+    # Validate the raw body in one pass instead of FastAPI's per-field parsing
     try:
-        # Process each log entry
-        processed_logs = []
+        log_batch = LogBatchRequest.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    
+    try:
+        # Build plain column mappings for a single multi-row INSERT
+        rows = []
         for log_data in log_batch.logs:
-            # Create log entry
-            log_entry = LogEntry(
-                timestamp=datetime.fromisoformat(log_data.timestamp) if log_data.timestamp else datetime.utcnow(),
-                service=log_data.service,
-                severity=log_data.severity,
-                message=log_data.message,
-                source_ip=log_data.source_ip,
-                user_id=log_data.user_id,
-                request_id=log_data.request_id,
-                log_metadata=json.dumps(log_data.metadata) if log_data.metadata else None
-            )
-            
-            db.add(log_entry)
-            processed_logs.append(log_entry)
+            rows.append({
+                "timestamp": _parse_iso(log_data.timestamp) if log_data.timestamp else datetime.now(timezone.utc),
+                "service": log_data.service,
+                "severity": log_data.severity,
+                "message": log_data.message,
+                "source_ip": log_data.source_ip,
+                "user_id": log_data.user_id,
+                "request_id": log_data.request_id,
+                "log_metadata": log_data.metadata or None
+            })
         
         # Commit to database
-        db.commit()
+        if rows:
+            await LogEntry.bulk_insert(db, rows)
+            await db.commit()
         
-        # Refresh to get IDs
-        for log_entry in processed_logs:
-            db.refresh(log_entry)
+        # Analysis doesn't need row IDs, so skip re-reading the inserted rows
+        logs = [
+            {
+                "timestamp": row["timestamp"].isoformat(),
+                "service": row["service"],
+                "severity": row["severity"],
+                "message": row["message"],
+                "source_ip": row["source_ip"],
+                "user_id": row["user_id"],
+                "request_id": row["request_id"],
+                "metadata": log_data.metadata or {}
+            }
+            for row, log_data in zip(rows, log_batch.logs)
+        ]
         
         # Background tasks for analysis and alerting
-        background_tasks.add_task(analyze_logs_for_anomalies, [log.to_dict() for log in processed_logs])
-        background_tasks.add_task(check_alert_conditions, [log.to_dict() for log in processed_logs])
+        background_tasks.add_task(analyze_logs_for_anomalies, logs)
+        background_tasks.add_task(check_alert_conditions, Counter(row["severity"] for row in rows))
         
         return {
             "status": "success",
-            "processed_logs": len(processed_logs),
-            "timestamp": datetime.utcnow().isoformat()
+            "processed_logs": len(rows),
+            "timestamp": datetime.now(timezone.utc).isoformat()
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to process logs: {str(e)}")
 
 # Single log ingestion endpoint
@@ -123,38 +187,42 @@ async def ingest_logs(
 async def ingest_single_log(
     log_data: LogEntryRequest,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Ingest a single log entry"""
     try:
         # Create log entry
         log_entry = LogEntry(
-            timestamp=datetime.fromisoformat(log_data.timestamp) if log_data.timestamp else datetime.utcnow(),
+            timestamp=_parse_iso(log_data.timestamp) if log_data.timestamp else datetime.now(timezone.utc),
             service=log_data.service,
             severity=log_data.severity,
             message=log_data.message,
             source_ip=log_data.source_ip,
             user_id=log_data.user_id,
             request_id=log_data.request_id,
-            log_metadata=json.dumps(log_data.metadata) if log_data.metadata else None
+            log_metadata=log_data.metadata or None
         )
         
+        # Flushing assigns the id, so the row can be serialized before commit
+        # expires it and without refreshing it from the database
         db.add(log_entry)
-        db.commit()
-        db.refresh(log_entry)
+        await db.flush()
+        log_dict = log_entry.to_dict()
+        await db.commit()
         
-        # Background tasks
-        background_tasks.add_task(analyze_logs_for_anomalies, [log_entry.to_dict()])
-        background_tasks.add_task(check_alert_conditions, [log_entry.to_dict()])
+        # Background tasks share the one serialized copy
+        logs = [log_dict]
+        background_tasks.add_task(analyze_logs_for_anomalies, logs)
+        background_tasks.add_task(check_alert_conditions, {log_dict["severity"]: 1})
         
-        return LogResponse(**log_entry.to_dict())
+        return LogResponse(**log_dict)
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to process log: {str(e)}")
 
 # Get logs endpoint
-@app.get("/api/logs", response_model=List[LogResponse])
+@app.get("/api/logs", response_model=List[LogResponse], response_model_exclude_unset=True)
 async def get_logs(
     limit: int = 100,
     offset: int = 0,
@@ -162,66 +230,94 @@ async def get_logs(
     severity: Optional[str] = None,
     start_time: Optional[str] = None,
     end_time: Optional[str] = None,
-    db: Session = Depends(get_db)
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get logs with optional filtering"""
+    """Get logs with optional filtering; `fields` is a comma-separated projection"""
+    selected = None
+    if fields:
+        selected = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in selected if field not in LogEntry.FIELD_COLUMNS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    
     try:
-        query = db.query(LogEntry)
+        query = select(LogEntry)
+        
+        # Only load the requested columns
+        if selected:
+            query = query.options(load_only(
+                *(getattr(LogEntry, LogEntry.FIELD_COLUMNS[field]) for field in selected)
+            ))
         
         # Apply filters
         if service:
-            query = query.filter(LogEntry.service == service)
+            query = query.where(LogEntry.service == service)
         if severity:
-            query = query.filter(LogEntry.severity == severity)
+            query = query.where(LogEntry.severity == severity)
         if start_time:
-            start_dt = datetime.fromisoformat(start_time)
-            query = query.filter(LogEntry.timestamp >= start_dt)
+            start_dt = _parse_iso(start_time)
+            query = query.where(LogEntry.timestamp >= start_dt)
         if end_time:
-            end_dt = datetime.fromisoformat(end_time)
-            query = query.filter(LogEntry.timestamp <= end_dt)
+            end_dt = _parse_iso(end_time)
+            query = query.where(LogEntry.timestamp <= end_dt)
         
         # Apply pagination and ordering
-        logs = query.order_by(LogEntry.timestamp.desc()).offset(offset).limit(limit).all()
+        query = query.order_by(LogEntry.timestamp.desc(), LogEntry.id.desc()).offset(offset).limit(limit)
+        logs = (await db.execute(query)).scalars().all()
         
-        return [LogResponse(**log.to_dict()) for log in logs]
+        return [LogResponse(**log.to_dict(selected)) for log in logs]
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve logs: {str(e)}")
 
+def _hour_bucket(db: AsyncSession):
+    """SQL expression labelling LogEntry.timestamp with its hour as 'YYYY-MM-DD HH:00'"""
+    if db.bind.dialect.name == "postgresql":
+        return func.to_char(func.date_trunc("hour", LogEntry.timestamp), "YYYY-MM-DD HH24:00")
+    return func.strftime("%Y-%m-%d %H:00", LogEntry.timestamp)
+
+def _health_score(error_rate: float, critical_rate: float) -> int:
+    """Overall system health from 10 (perfect) to 0 (critical), given percentage rates"""
+    health_score = 10
+    
+    # Deduct points for errors and critical issues
+    health_score -= min(error_rate * 0.1, 3)  # Max 3 points for errors
+    health_score -= min(critical_rate * 0.5, 5)  # Max 5 points for critical
+    
+    return max(int(health_score), 0)
+
 # Get log statistics endpoint
 @app.get("/api/logs/stats")
 async def get_log_stats(
     hours: int = 24,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get log statistics for the specified time period"""
     try:
         # Calculate time range
-        end_time = datetime.utcnow()
+        end_time = datetime.now(timezone.utc)
         start_time = end_time - timedelta(hours=hours)
         
-        # Get logs in time range (limit to prevent memory issues)
-        logs = db.query(LogEntry).filter(
-            LogEntry.timestamp >= start_time,
-            LogEntry.timestamp <= end_time
-        ).limit(10000).all()  # Limit to 10k logs max
+        # Aggregate in the database instead of hydrating every row
+        time_filter = (LogEntry.timestamp >= start_time, LogEntry.timestamp <= end_time)
+        hour_bucket = _hour_bucket(db)
         
-        # Calculate statistics
-        total_logs = len(logs)
-        severity_counts = {}
-        service_counts = {}
-        hourly_counts = {}
-        
-        for log in logs:
-            # Severity counts
-            severity_counts[log.severity] = severity_counts.get(log.severity, 0) + 1
-            
-            # Service counts
-            service_counts[log.service] = service_counts.get(log.service, 0) + 1
-            
-            # Hourly counts
-            hour_key = log.timestamp.strftime("%Y-%m-%d %H:00")
-            hourly_counts[hour_key] = hourly_counts.get(hour_key, 0) + 1
+        severity_counts = dict((await db.execute(
+            select(LogEntry.severity, func.count(LogEntry.id))
+            .where(*time_filter).group_by(LogEntry.severity)
+        )).all())
+        service_counts = dict((await db.execute(
+            select(LogEntry.service, func.count(LogEntry.id))
+            .where(*time_filter).group_by(LogEntry.service)
+        )).all())
+        hourly_counts = dict((await db.execute(
+            select(hour_bucket, func.count(LogEntry.id))
+            .where(*time_filter).group_by(hour_bucket).order_by(hour_bucket)
+        )).all())
+        total_logs = sum(severity_counts.values())
+        error_rate = (severity_counts.get("ERROR", 0) / total_logs * 100) if total_logs > 0 else 0
+        critical_rate = (severity_counts.get("CRITICAL", 0) / total_logs * 100) if total_logs > 0 else 0
         
         return {
             "time_range": {
@@ -230,6 +326,9 @@ async def get_log_stats(
                 "hours": hours
             },
             "total_logs": total_logs,
+            "error_rate": error_rate,
+            "critical_rate": critical_rate,
+            "health_score": _health_score(error_rate, critical_rate),
             "severity_distribution": severity_counts,
             "service_distribution": service_counts,
             "hourly_distribution": hourly_counts
@@ -241,34 +340,38 @@ async def get_log_stats(
 # Background task functions
 async def analyze_logs_for_anomalies(logs: List[Dict]):
     """Analyze logs for anomalies in background"""
+    # Small batches can't produce anomalies; skip scheduling the detection work
+    if len(logs) < AnomalyDetector.MIN_LOGS_FOR_DETECTION:
+        return
+    
     try:
         anomalies = await anomaly_detector.detect_anomalies(logs)
         if anomalies:
-            print(f"Detected {len(anomalies)} anomalies")
+            logger.info("Detected %d anomalies", len(anomalies))
             # Here you could store anomalies in database or trigger alerts
-    except Exception as e:
-        print(f"Error in anomaly detection: {e}")
+    except Exception:
+        logger.exception("Error in anomaly detection")
 
-async def check_alert_conditions(logs: List[Dict]):
-    """Check if logs meet alert conditions in background"""
+async def check_alert_conditions(severity_counts: Dict[str, int]):
+    """Check if ingested severity counts meet alert conditions in background"""
     try:
-        # Count errors and critical logs
-        error_count = sum(1 for log in logs if log["severity"] == "ERROR")
-        critical_count = sum(1 for log in logs if log["severity"] == "CRITICAL")
+        # Counts are taken at ingestion, so there's nothing left to scan here
+        error_count = severity_counts.get("ERROR", 0)
+        critical_count = severity_counts.get("CRITICAL", 0)
         
-        # Check thresholds
+        # Check thresholds; each alert type has its own cooldown
+        alerts = []
         if error_count >= Config.ERROR_THRESHOLD:
-            await telegram_alerter.send_alert(
-                f"High error rate detected: {error_count} errors in recent logs"
-            )
+            alerts.append(telegram_alerter.send_error_spike_alert(error_count, Config.ERROR_THRESHOLD))
         
         if critical_count >= Config.CRITICAL_THRESHOLD:
-            await telegram_alerter.send_alert(
-                f"Critical alerts detected: {critical_count} critical logs in recent batch"
-            )
+            alerts.append(telegram_alerter.send_critical_spike_alert(critical_count, Config.CRITICAL_THRESHOLD))
+        
+        # Queue them together so they go out in the same batched message
+        await asyncio.gather(*alerts)
             
-    except Exception as e:
-        print(f"Error in alert checking: {e}")
+    except Exception:
+        logger.exception("Error in alert checking")
 
 if __name__ == "__main__":
     import uvicorn
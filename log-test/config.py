@@ -7,10 +7,17 @@ load_dotenv()
 class Config:
     # Gemini API Configuration
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+    GEMINI_CACHE_SIZE = int(os.getenv("GEMINI_CACHE_SIZE", "256"))  # cached responses kept in memory
+    GEMINI_EMBEDDING_MODEL = os.getenv("GEMINI_EMBEDDING_MODEL", "models/text-embedding-004")
+    GEMINI_SEMANTIC_CACHE_SIZE = int(os.getenv("GEMINI_SEMANTIC_CACHE_SIZE", "512"))  # per analysis type
+    GEMINI_SEMANTIC_THRESHOLD = float(os.getenv("GEMINI_SEMANTIC_THRESHOLD", "0.95"))  # cosine similarity; above 1 disables
+    GEMINI_CACHE_PATH = os.getenv("GEMINI_CACHE_PATH", "./data/gemini_cache.db")  # empty keeps the semantic cache in memory only
+    GEMINI_CACHE_TTL = int(os.getenv("GEMINI_CACHE_TTL", "21600"))  # seconds a semantic cache response can be reused
     
     # Telegram Bot Configuration
     TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
     TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
+    TELEGRAM_BATCH_WINDOW = float(os.getenv("TELEGRAM_BATCH_WINDOW", "2.0"))  # seconds to coalesce alerts; 0 sends each at once
     
     # Application Configuration
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
@@ -19,11 +26,22 @@ class Config:
     API_PORT = int(os.getenv("API_PORT", "8000"))
     STREAMLIT_PORT = int(os.getenv("STREAMLIT_PORT", "8501"))
     
+    # Database Connection Pool Configuration (server databases only)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds
+    DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))  # 0 disables, e.g. behind PgBouncer
+    # Range-partition a newly created logs table by month (PostgreSQL only)
+    PARTITION_LOGS = os.getenv("PARTITION_LOGS", "false").lower() in ("1", "true", "yes")
+    
     # Alerting Configuration
     ERROR_THRESHOLD = int(os.getenv("ERROR_THRESHOLD", "10"))
     CRITICAL_THRESHOLD = int(os.getenv("CRITICAL_THRESHOLD", "5"))
     ANOMALY_THRESHOLD = float(os.getenv("ANOMALY_THRESHOLD", "0.8"))
     
+    # Anomaly Detection Configuration
+    IFOREST_CACHE_PATH = os.getenv("IFOREST_CACHE_PATH", "./data/iforest.joblib")
+    
     # Log Generation Configuration
     LOG_GENERATION_INTERVAL = 5  # seconds
     MAX_LOGS_PER_BATCH = 15
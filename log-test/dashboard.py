@@ -1,14 +1,20 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import orjson
 from datetime import datetime, timedelta
 import asyncio
-import time
-from typing import Dict, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from config import Config
 from gemini_insights import GeminiInsights
 
@@ -21,17 +27,17 @@ st.set_page_config(
 )
 
 # Custom CSS
-st.markdown("""
+CUSTOM_CSS = """
 <style>
     .main-header {
-        font-size: 3rem;
+        font-size: 2rem;
         color: #1f77b4;
         text-align: center;
-        margin-bottom: 2rem;
+        margin-bottom: 1rem;
     }
     .metric-card {
         background-color: #f0f2f6;
-        padding: 1rem;
+        padding: 0.5rem;
         border-radius: 0.5rem;
         border-left: 4px solid #1f77b4;
     }
@@ -46,18 +52,6 @@ st.markdown("""
     .status-critical {
         color: #dc3545;
         font-weight: bold;
-    }
-        .main-header {
-        font-size: 2rem;
-        color: #1f77b4;
-        text-align: center;
-        margin-bottom: 1rem;
-    }
-    .metric-card {
-        background-color: #f0f2f6;
-        padding: 0.5rem;
-        border-radius: 0.5rem;
-        border-left: 4px solid #1f77b4;
     }
     .insight-box {
         background-color: #000000;
@@ -127,36 +121,257 @@ st.markdown("""
         border-left: 4px solid #dc3545;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+# Streamlit clears the page on every rerun, so the style block has to be sent
+# each time; the frontend leaves an unchanged element in place
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+
+# Most points the timeline chart is allowed to send to the browser
+TIMELINE_MAX_POINTS = 500
+
+# Log fields shown in the recent logs table and passed to the AI insights;
+# ids and request ids are never used, so they aren't fetched
+RECENT_LOG_FIELDS = ("timestamp", "service", "severity", "message", "source_ip", "user_id", "metadata")
+
+# Severity levels from least to most severe
+SEVERITY_LEVELS = ["INFO", "WARNING", "ERROR", "CRITICAL"]
+
+# Background colors for the severity column of the recent logs table
+SEVERITY_CELL_STYLES = {
+    'INFO': 'background-color: #d4edda',
+    'WARNING': 'background-color: #fff3cd',
+    'ERROR': 'background-color: #f8d7da',
+    'CRITICAL': 'background-color: #f5c6cb'
+}
+
+def _severity_cell_styles(col: pd.Series) -> pd.Series:
+    """Color code severity, one vectorized lookup for the whole column;
+    unknown severities are left unstyled"""
+    return col.map(SEVERITY_CELL_STYLES).astype(object).fillna('')
+
+# Tables longer than this skip severity coloring and render unstyled
+STYLED_TABLE_MAX_ROWS = 500
+
+# Services beyond this many bars are grouped under "Other"
+SERVICE_CHART_MAX_BARS = 50
+
+# For demo purposes, the anomaly insights tab explains these mock anomalies
+DEMO_ANOMALIES = [
+    {
+        "type": "volume_spike",
+        "severity": "WARNING",
+        "description": "Unusual log volume detected",
+        "confidence_score": 0.85,
+        "affected_service": "database"
+    }
+]
+
+@st.cache_resource
+def _event_loop() -> asyncio.AbstractEventLoop:
+    """Process-wide event loop on a daemon thread; the async Gemini client's
+    channel is bound to the loop it first runs on, so every session shares one"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="gemini-loop", daemon=True).start()
+    return loop
+
+def _run_async(coro):
+    """Run a coroutine on the shared event loop and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, _event_loop()).result()
+
+@st.cache_resource
+def _gemini_insights() -> GeminiInsights:
+    """One client per process so its response caches survive script reruns"""
+    return GeminiInsights()
+
+@st.cache_resource
+def _http_session() -> requests.Session:
+    """Shared keep-alive session; the script re-executes on every rerun, so the
+    session lives in the resource cache rather than at module scope"""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(
+        pool_connections=2,
+        pool_maxsize=4,
+        max_retries=Retry(total=2, backoff_factor=0.1)
+    ))
+    session.headers.update({"Connection": "keep-alive", "Accept-Encoding": "gzip"})
+    return session
+
+# API responses are memoized for a short TTL so widget interactions and
+# reruns don't hit the API again; errors raise and are therefore not cached
+@st.cache_data(ttl=30, show_spinner=False)
+def _get_stats(api_url: str, hours: int) -> Dict:
+    """Fetch log statistics for the last `hours` hours"""
+    response = _http_session().get(f"{api_url}/api/logs/stats", params={"hours": hours}, timeout=5)
+    response.raise_for_status()
+    return orjson.loads(response.content)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _get_recent(api_url: str, limit: int, fields: str) -> List[Dict]:
+    """Fetch the `limit` most recent logs, projected to the comma-separated `fields`"""
+    response = _http_session().get(
+        f"{api_url}/api/logs", params={"limit": limit, "fields": fields}, timeout=5
+    )
+    response.raise_for_status()
+    return orjson.loads(response.content)
+
+# Lives as long as the API response it is built from; a few snapshots cover
+# reruns across sessions without keeping every past one
+@st.cache_data(ttl=30, max_entries=8, show_spinner=False)
+def _recent_logs_frame(logs: List[Dict]) -> pd.DataFrame:
+    """Build the recent logs table with display-formatted timestamps"""
+    df = pd.DataFrame.from_records(logs, columns=RECENT_LOG_FIELDS)
+    
+    # Low-cardinality columns as categoricals; severities outside the known
+    # levels are kept (after them) rather than turned into NaN
+    extra_levels = sorted(set(df['severity'].dropna()) - set(SEVERITY_LEVELS))
+    df['severity'] = pd.Categorical(df['severity'], categories=SEVERITY_LEVELS + extra_levels, ordered=True)
+    df['service'] = df['service'].astype('category')
+    
+    # Format timestamp
+    df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601').dt.strftime('%Y-%m-%d %H:%M:%S')
+    
+    return df
+
+def _lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Pick `n_out` indices that preserve the visual shape of a series
+    (Largest-Triangle-Three-Buckets); first and last points are always kept"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    # Interior points are split into n_out - 2 buckets; each bucket contributes
+    # the point forming the largest triangle with the previous pick and the
+    # average of the next bucket
+    edges = np.floor(np.linspace(1, n - 1, n_out - 1)).astype(np.int64)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[end:edges[i + 2]].mean()
+            next_y = y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        
+        areas = np.abs(
+            (x[a] - next_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (next_y - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        indices[i + 1] = a
+    
+    return indices
+
+# Charts are built once per distinct input and kept as serialized figures;
+# inputs are passed as tuples of (label, count) pairs so they hash cheaply.
+# Stats change every auto-refresh (60s), so older figures expire with it and
+# only a few recent ones are kept
+@st.cache_data(ttl=60, max_entries=8, show_spinner=False)
+def _severity_figure_json(severity_items: Tuple[Tuple[str, int], ...]) -> str:
+    """Severity distribution pie chart as Plotly JSON"""
+    severity_dist = dict(severity_items)
+    
+    # Create pie chart
+    fig = px.pie(
+        values=list(severity_dist.values()),
+        names=list(severity_dist.keys()),
+        title="Log Severity Distribution",
+        color_discrete_map={
+            'INFO': '#28a745',
+            'WARNING': '#ffc107',
+            'ERROR': '#fd7e14',
+            'CRITICAL': '#dc3545'
+        }
+    )
+    
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    fig.update_layout(height=400)
+    return fig.to_json()
+
+@st.cache_data(ttl=60, max_entries=8, show_spinner=False)
+def _service_figure_json(service_items: Tuple[Tuple[str, int], ...]) -> str:
+    """Log volume by service bar chart as Plotly JSON"""
+    # Create bar chart
+    df = pd.DataFrame(list(service_items), columns=['Service', 'Count'])
+    df = df.sort_values('Count', ascending=True)
+    
+    # Fold the long tail into one bar so the chart stays readable and light
+    if len(df) > SERVICE_CHART_MAX_BARS:
+        tail = df.iloc[:-(SERVICE_CHART_MAX_BARS - 1)]
+        df = pd.concat([
+            pd.DataFrame({'Service': ['Other'], 'Count': [tail['Count'].sum()]}),
+            df.iloc[-(SERVICE_CHART_MAX_BARS - 1):]
+        ], ignore_index=True)
+    
+    fig = px.bar(
+        df,
+        x='Count',
+        y='Service',
+        orientation='h',
+        title="Log Volume by Service",
+        color='Count',
+        color_continuous_scale='Blues'
+    )
+    
+    fig.update_layout(height=400, yaxis={'categoryorder': 'total ascending'})
+    return fig.to_json()
+
+@st.cache_data(ttl=60, max_entries=8, show_spinner=False)
+def _timeline_figure_json(hourly_items: Tuple[Tuple[str, int], ...]) -> str:
+    """Log volume over time line chart as Plotly JSON"""
+    # Convert to DataFrame; the API returns hours in order and Plotly
+    # parses the hour labels itself
+    df = pd.DataFrame(list(hourly_items), columns=['Hour', 'Count'])
+    
+    # Downsample long ranges so the browser only renders what's visible
+    if len(df) > TIMELINE_MAX_POINTS:
+        keep = _lttb_indices(
+            pd.to_datetime(df['Hour']).to_numpy(dtype='int64'), df['Count'].to_numpy(), TIMELINE_MAX_POINTS
+        )
+        df = df.iloc[keep]
+    
+    # Create line chart (WebGL, so long series don't stall the browser)
+    fig = go.Figure(go.Scattergl(
+        x=df['Hour'],
+        y=df['Count'],
+        mode='lines+markers'
+    ))
+    
+    fig.update_layout(
+        title="Log Volume Over Time",
+        height=400,
+        xaxis_title="Time",
+        yaxis_title="Log Count"
+    )
+    return fig.to_json()
 
 class LogOpsDashboard:
     def __init__(self):
         self.api_url = f"http://{Config.API_HOST}:{Config.API_PORT}"
-        self.gemini_insights = GeminiInsights()
-        self.last_update = None
+        self.gemini_insights = _gemini_insights()
         
     def fetch_logs_data(self, hours: int = 24) -> Dict:
         """Fetch logs data from API"""
         try:
-            response = requests.get(f"{self.api_url}/api/logs/stats", params={"hours": hours}, timeout=5)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                st.error(f"Failed to fetch logs data: {response.status_code}")
-                return {}
+            return _get_stats(self.api_url, hours)
+        except requests.HTTPError as e:
+            st.error(f"Failed to fetch logs data: {e.response.status_code}")
+            return {}
         except Exception as e:
             st.error(f"Error fetching logs data: {e}")
             return {}
     
-    def fetch_recent_logs(self, limit: int = 50) -> List[Dict]:
+    def fetch_recent_logs(self, limit: int = 50, fields: Tuple[str, ...] = RECENT_LOG_FIELDS) -> List[Dict]:
         """Fetch recent logs from API"""
         try:
-            response = requests.get(f"{self.api_url}/api/logs", params={"limit": limit}, timeout=5)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                st.error(f"Failed to fetch recent logs: {response.status_code}")
-                return []
+            return _get_recent(self.api_url, limit, ",".join(fields))
+        except requests.HTTPError as e:
+            st.error(f"Failed to fetch recent logs: {e.response.status_code}")
+            return []
         except Exception as e:
             st.error(f"Error fetching recent logs: {e}")
             return []
@@ -204,9 +419,11 @@ class LogOpsDashboard:
         # Auto-refresh
         auto_refresh = st.sidebar.checkbox("Auto-refresh (60s)", value=False)
         
-        # Manual refresh button
+        # Manual refresh button; the click already reruns the script, so
+        # dropping the cached responses is enough to refetch
         if st.sidebar.button("🔄 Refresh Data"):
-            st.rerun()
+            _get_stats.clear()
+            _get_recent.clear()
         
         return hours, services, severities, auto_refresh
     
@@ -227,127 +444,50 @@ class LogOpsDashboard:
         
         with col2:
             severity_dist = stats.get('severity_distribution', {})
-            error_count = severity_dist.get('ERROR', 0)
-            error_rate = (error_count / total_logs * 100) if total_logs > 0 else 0
             st.metric(
                 label="❌ Error Rate",
-                value=f"{error_rate:.1f}%",
-                delta=f"{error_count:,} errors"
+                value=f"{stats.get('error_rate', 0):.1f}%",
+                delta=f"{severity_dist.get('ERROR', 0):,} errors"
             )
         
         with col3:
-            critical_count = severity_dist.get('CRITICAL', 0)
-            critical_rate = (critical_count / total_logs * 100) if total_logs > 0 else 0
             st.metric(
                 label="💥 Critical Rate",
-                value=f"{critical_rate:.1f}%",
-                delta=f"{critical_count:,} critical"
+                value=f"{stats.get('critical_rate', 0):.1f}%",
+                delta=f"{severity_dist.get('CRITICAL', 0):,} critical"
             )
         
         with col4:
-            # Calculate health score
-            health_score = self.calculate_health_score(stats)
-            health_color = "status-healthy" if health_score >= 8 else "status-warning" if health_score >= 5 else "status-critical"
+            # Health score is computed by the API alongside the rates
             st.metric(
                 label="🏥 Health Score",
-                value=f"{health_score}/10",
+                value=f"{stats.get('health_score', 0)}/10",
                 delta=None
             )
     
-    def calculate_health_score(self, stats: Dict) -> int:
-        """Calculate overall system health score"""
-        if not stats:
-            return 0
-        
-        total_logs = stats.get('total_logs', 0)
-        if total_logs == 0:
-            return 10
-        
-        severity_dist = stats.get('severity_distribution', {})
-        error_rate = (severity_dist.get('ERROR', 0) / total_logs) * 100
-        critical_rate = (severity_dist.get('CRITICAL', 0) / total_logs) * 100
-        
-        # Health score calculation (10 = perfect, 0 = critical)
-        health_score = 10
-        
-        # Deduct points for errors and critical issues
-        health_score -= min(error_rate * 0.1, 3)  # Max 3 points for errors
-        health_score -= min(critical_rate * 0.5, 5)  # Max 5 points for critical
-        
-        return max(int(health_score), 0)
-    
     def render_severity_chart(self, stats: Dict):
         """Render severity distribution chart"""
         if not stats or 'severity_distribution' not in stats:
             return
         
-        severity_dist = stats['severity_distribution']
-        
-        # Create pie chart
-        fig = px.pie(
-            values=list(severity_dist.values()),
-            names=list(severity_dist.keys()),
-            title="Log Severity Distribution",
-            color_discrete_map={
-                'INFO': '#28a745',
-                'WARNING': '#ffc107',
-                'ERROR': '#fd7e14',
-                'CRITICAL': '#dc3545'
-            }
-        )
-        
-        fig.update_traces(textposition='inside', textinfo='percent+label')
-        fig.update_layout(height=400)
-        
-        st.plotly_chart(fig, use_container_width=True)
+        figure = _severity_figure_json(tuple(stats['severity_distribution'].items()))
+        st.plotly_chart(orjson.loads(figure), use_container_width=True)
     
     def render_service_chart(self, stats: Dict):
         """Render service distribution chart"""
         if not stats or 'service_distribution' not in stats:
             return
         
-        service_dist = stats['service_distribution']
-        
-        # Create bar chart
-        df = pd.DataFrame(list(service_dist.items()), columns=['Service', 'Count'])
-        df = df.sort_values('Count', ascending=True)
-        
-        fig = px.bar(
-            df,
-            x='Count',
-            y='Service',
-            orientation='h',
-            title="Log Volume by Service",
-            color='Count',
-            color_continuous_scale='Blues'
-        )
-        
-        fig.update_layout(height=400, yaxis={'categoryorder': 'total ascending'})
-        st.plotly_chart(fig, use_container_width=True)
+        figure = _service_figure_json(tuple(stats['service_distribution'].items()))
+        st.plotly_chart(orjson.loads(figure), use_container_width=True)
     
     def render_timeline_chart(self, stats: Dict):
         """Render timeline chart"""
         if not stats or 'hourly_distribution' not in stats:
             return
         
-        hourly_dist = stats['hourly_distribution']
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(list(hourly_dist.items()), columns=['Hour', 'Count'])
-        df['Hour'] = pd.to_datetime(df['Hour'])
-        df = df.sort_values('Hour')
-        
-        # Create line chart
-        fig = px.line(
-            df,
-            x='Hour',
-            y='Count',
-            title="Log Volume Over Time",
-            markers=True
-        )
-        
-        fig.update_layout(height=400, xaxis_title="Time", yaxis_title="Log Count")
-        st.plotly_chart(fig, use_container_width=True)
+        figure = _timeline_figure_json(tuple(stats['hourly_distribution'].items()))
+        st.plotly_chart(orjson.loads(figure), use_container_width=True)
     
     def render_recent_logs_table(self, logs: List[Dict]):
         """Render recent logs table"""
@@ -358,24 +498,16 @@ class LogOpsDashboard:
         st.subheader("📋 Recent Logs")
         
         # Convert to DataFrame
-        df = pd.DataFrame(logs)
-        
-        # Format timestamp
-        if 'timestamp' in df.columns:
-            df['timestamp'] = pd.to_datetime(df['timestamp']).dt.strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Color code severity
-        def color_severity(val):
-            colors = {
-                'INFO': 'background-color: #d4edda',
-                'WARNING': 'background-color: #fff3cd',
-                'ERROR': 'background-color: #f8d7da',
-                'CRITICAL': 'background-color: #f5c6cb'
-            }
-            return colors.get(val, '')
+        df = _recent_logs_frame(logs)
+        
+        # Large tables go straight to the virtualized grid; a Styler has to
+        # render CSS for every cell before anything is sent to the browser
+        if len(df) > STYLED_TABLE_MAX_ROWS:
+            st.dataframe(df, use_container_width=True, height=400)
+            return
         
         # Display table
-        styled_df = df.style.applymap(color_severity, subset=['severity'])
+        styled_df = df.style.apply(_severity_cell_styles, subset=['severity'])
         st.dataframe(styled_df, use_container_width=True, height=400)
     
     def render_ai_insights(self, stats: Dict, logs: List[Dict]):
@@ -386,54 +518,58 @@ class LogOpsDashboard:
             st.warning("Gemini API not configured. Please set GEMINI_API_KEY to enable AI insights.")
             return
         
+        # Generate every insight at once so the Gemini requests overlap
+        all_results = {}
+        if st.button("🚀 Run all insights"):
+            with st.spinner("Generating all insights..."):
+                all_results = _run_async(self.gemini_insights.run_full_report(logs, stats, DEMO_ANOMALIES))
+        
         # Create tabs for different insights
         tab1, tab2, tab3, tab4 = st.tabs(["📊 Pattern Analysis", "🔍 Anomaly Insights", "💡 Optimizations", "📈 Daily Summary"])
         
         with tab1:
+            result = all_results.get("pattern_analysis")
             if st.button("Analyze Log Patterns"):
                 with st.spinner("Analyzing log patterns..."):
-                    result = asyncio.run(self.gemini_insights.analyze_log_patterns(logs, stats))
-                    if 'error' not in result:
-                        st.markdown(f'<div class="insight-box">{result["analysis"]}</div>', unsafe_allow_html=True)
-                    else:
-                        st.error(f"Analysis failed: {result['error']}")
+                    result = _run_async(self.gemini_insights.analyze_log_patterns(logs, stats))
+            if result is not None:
+                if 'error' not in result:
+                    st.markdown(f'<div class="insight-box">{result["analysis"]}</div>', unsafe_allow_html=True)
+                else:
+                    st.error(f"Analysis failed: {result['error']}")
         
         with tab2:
+            result = all_results.get("anomaly_insights")
             if st.button("Generate Anomaly Insights"):
                 with st.spinner("Generating anomaly insights..."):
-                    # For demo purposes, create some mock anomalies
-                    mock_anomalies = [
-                        {
-                            "type": "volume_spike",
-                            "severity": "WARNING",
-                            "description": "Unusual log volume detected",
-                            "confidence_score": 0.85,
-                            "affected_service": "database"
-                        }
-                    ]
-                    result = asyncio.run(self.gemini_insights.generate_anomaly_insights(mock_anomalies, logs))
-                    if 'error' not in result:
-                        st.markdown(f'<div class="insight-box">{result["insights"]}</div>', unsafe_allow_html=True)
-                    else:
-                        st.error(f"Insights generation failed: {result['error']}")
+                    result = _run_async(self.gemini_insights.generate_anomaly_insights(DEMO_ANOMALIES, logs))
+            if result is not None:
+                if 'error' not in result:
+                    st.markdown(f'<div class="insight-box">{result["insights"]}</div>', unsafe_allow_html=True)
+                else:
+                    st.error(f"Insights generation failed: {result['error']}")
         
         with tab3:
+            result = all_results.get("optimization_suggestions")
             if st.button("Get Optimization Suggestions"):
                 with st.spinner("Generating optimization suggestions..."):
-                    result = asyncio.run(self.gemini_insights.suggest_optimizations(logs, stats))
-                    if 'error' not in result:
-                        st.markdown(f'<div class="insight-box">{result["recommendations"]}</div>', unsafe_allow_html=True)
-                    else:
-                        st.error(f"Optimization analysis failed: {result['error']}")
+                    result = _run_async(self.gemini_insights.suggest_optimizations(logs, stats))
+            if result is not None:
+                if 'error' not in result:
+                    st.markdown(f'<div class="insight-box">{result["recommendations"]}</div>', unsafe_allow_html=True)
+                else:
+                    st.error(f"Optimization analysis failed: {result['error']}")
         
         with tab4:
+            result = all_results.get("daily_summary")
             if st.button("Generate Daily Summary"):
                 with st.spinner("Generating daily summary..."):
-                    result = asyncio.run(self.gemini_insights.generate_daily_summary(stats))
-                    if 'error' not in result:
-                        st.markdown(f'<div class="insight-box">{result["summary"]}</div>', unsafe_allow_html=True)
-                    else:
-                        st.error(f"Summary generation failed: {result['error']}")
+                    result = _run_async(self.gemini_insights.generate_daily_summary(stats))
+            if result is not None:
+                if 'error' not in result:
+                    st.markdown(f'<div class="insight-box">{result["summary"]}</div>', unsafe_allow_html=True)
+                else:
+                    st.error(f"Summary generation failed: {result['error']}")
     
     def render_anomaly_detection(self):
         """Render anomaly detection section"""
@@ -477,27 +613,23 @@ class LogOpsDashboard:
             st.success("✅ All Systems Operational")
             st.info("📊 Uptime: 99.9%")
     
-    def run(self):
-        """Main dashboard run method"""
-        self.render_header()
-        
-        # Sidebar controls
-        hours, services, severities, auto_refresh = self.render_sidebar()
-        
-        # Auto-refresh logic
-        if auto_refresh:
-            if self.last_update is None or time.time() - self.last_update > 60:
-                self.last_update = time.time()
-                st.rerun()
-        
-        # Fetch data
+    def render_data_panel(self, hours: int):
+        """Fetch data and render the metrics, charts and recent logs"""
+        # Fetch data; the two endpoints are independent, so overlap the requests.
+        # Worker threads get the script context so fetch errors can still render
         with st.spinner("Loading data..."):
-            stats = self.fetch_logs_data(hours)
-            recent_logs = self.fetch_recent_logs(50)
+            ctx = get_script_run_ctx()
+            with ThreadPoolExecutor(
+                max_workers=2,
+                initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+            ) as executor:
+                stats_future = executor.submit(self.fetch_logs_data, hours)
+                recent_future = executor.submit(self.fetch_recent_logs, 50)
+                stats, recent_logs = stats_future.result(), recent_future.result()
         
         if not stats:
             st.error("Failed to load data. Please check if the API is running.")
-            return
+            return {}, []
         
         # Main content
         self.render_metrics(stats)
@@ -519,6 +651,23 @@ class LogOpsDashboard:
         # Recent logs
         self.render_recent_logs_table(recent_logs)
         
+        return stats, recent_logs
+    
+    def run(self):
+        """Main dashboard run method"""
+        self.render_header()
+        
+        # Sidebar controls
+        hours, services, severities, auto_refresh = self.render_sidebar()
+        
+        # Auto-refresh only reruns the data panel as a fragment; the header,
+        # sidebar and AI insight tabs are left as they are
+        data_panel = st.fragment(self.render_data_panel, run_every="60s" if auto_refresh else None)
+        stats, recent_logs = data_panel(hours)
+        
+        if not stats:
+            return
+        
         # AI Insights
         self.render_ai_insights(stats, recent_logs)
         
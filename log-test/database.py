@@ -1,56 +1,217 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Float
+from sqlalchemy import create_engine, func, insert, inspect, make_url, text, Column, Integer, String, DateTime, Text, Float, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime
-import json
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from datetime import date, datetime, timedelta
+import logging
+from typing import Dict, Iterable, List, Optional
 from config import Config
 
+logger = logging.getLogger(__name__)
+
 Base = declarative_base()
 
+# Portable JSON that is stored as binary JSONB on PostgreSQL, so it can be indexed and queried
+MetadataJSON = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+
+# Partitioned PostgreSQL tables must include the partition key in their
+# primary key, so timestamp joins id there when partitioning is on
+PARTITION_LOGS = Config.PARTITION_LOGS and make_url(Config.DATABASE_URL).get_backend_name() == "postgresql"
+
 class LogEntry(Base):
     __tablename__ = "logs"
     
-    id = Column(Integer, primary_key=True, index=True)
-    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
-    service = Column(String(50), index=True)
-    severity = Column(String(20), index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    timestamp = Column(DateTime(timezone=True), server_default=func.now(), primary_key=PARTITION_LOGS)
+    service = Column(String(50))
+    severity = Column(String(20))
     message = Column(Text)
     source_ip = Column(String(45))
     user_id = Column(String(100))
     request_id = Column(String(100))
-    log_metadata = Column(Text)  # JSON string for additional data
-    
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "timestamp": self.timestamp.isoformat(),
-            "service": self.service,
-            "severity": self.severity,
-            "message": self.message,
-            "source_ip": self.source_ip,
-            "user_id": self.user_id,
-            "request_id": self.request_id,
-            "metadata": json.loads(self.log_metadata) if self.log_metadata else {}
-        }
+    log_metadata = Column(MetadataJSON)  # Additional data, encoded by the driver
+    
+    # Covering indexes for the stats endpoint: time-range scan, then group by severity/service
+    __table_args__ = (
+        Index("ix_logs_timestamp_severity", "timestamp", "severity"),
+        Index("ix_logs_timestamp_service", "timestamp", "service"),
+        # Newest-first listing of /api/logs, with id breaking timestamp ties
+        Index("ix_logs_timestamp_id_desc", timestamp.desc(), id.desc()),
+        # Metadata key/containment lookups; GIN only exists on PostgreSQL
+        Index("ix_logs_metadata_gin", "log_metadata", postgresql_using="gin").ddl_if(dialect="postgresql"),
+        # Monthly range partitions let time-window queries skip old months entirely
+        {"postgresql_partition_by": "RANGE (timestamp)"} if PARTITION_LOGS else {},
+    )
+    
+    @classmethod
+    def bulk_insert(cls, session, rows: List[Dict]):
+        """Insert many rows of column mappings in one executemany statement.
+        
+        Returns session.execute's result; await it when given an AsyncSession.
+        """
+        return session.execute(insert(cls), rows)
+    
+    # Serialized field name -> mapped attribute it is read from
+    FIELD_COLUMNS = {
+        "id": "id",
+        "timestamp": "timestamp",
+        "service": "service",
+        "severity": "severity",
+        "message": "message",
+        "source_ip": "source_ip",
+        "user_id": "user_id",
+        "request_id": "request_id",
+        "metadata": "log_metadata"
+    }
+    
+    def to_dict(self, fields: Optional[Iterable[str]] = None):
+        # Only touch the requested attributes, so columns left out by
+        # load_only() are never lazy-loaded one row at a time
+        if fields is None:
+            fields = self.FIELD_COLUMNS
+        
+        data = {}
+        for field in fields:
+            value = getattr(self, self.FIELD_COLUMNS[field])
+            if field == "timestamp":
+                value = value.isoformat()
+            elif field == "metadata":
+                value = value or {}
+            data[field] = value
+        return data
 
 class AnomalyDetection(Base):
     __tablename__ = "anomalies"
     
     id = Column(Integer, primary_key=True, index=True)
-    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    timestamp = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     anomaly_type = Column(String(50))
     severity = Column(String(20))
     description = Column(Text)
     confidence_score = Column(Float)
     affected_service = Column(String(50))
-    anomaly_metadata = Column(Text)
+    anomaly_metadata = Column(MetadataJSON)
 
 # Database setup
-engine = create_engine(Config.DATABASE_URL)
+def _engine_options(url: str) -> dict:
+    """Pool settings for server databases; SQLite connections are local file handles"""
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        return {}
+    
+    options = {
+        "pool_size": Config.DB_POOL_SIZE,
+        "max_overflow": Config.DB_MAX_OVERFLOW,
+        "pool_pre_ping": True,  # Replace connections dropped by a database restart
+        "pool_recycle": Config.DB_POOL_RECYCLE,
+        "pool_use_lifo": True,  # Let idle connections beyond the burst age out
+    }
+    if backend == "postgresql":
+        # Sessions run in UTC so server-side now() defaults and hourly stats
+        # buckets are in UTC, like the aware UTC datetimes the API binds
+        driver = make_url(url).get_driver_name()
+        if driver == "asyncpg":
+            options["connect_args"] = {
+                "server_settings": {"application_name": "logops", "timezone": "UTC"},
+                # Reuse parsed/planned statements across calls on a connection
+                "prepared_statement_cache_size": Config.DB_STATEMENT_CACHE_SIZE,
+                "statement_cache_size": Config.DB_STATEMENT_CACHE_SIZE,
+            }
+        else:
+            options["connect_args"] = {"application_name": "logops", "options": "-c timezone=UTC"}
+            if driver == "psycopg":
+                # psycopg 3 prepares a statement server-side after this many runs
+                options["connect_args"]["prepare_threshold"] = 1 if Config.DB_STATEMENT_CACHE_SIZE else None
+    return options
+
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+# Drivers that serve both engines as-is (psycopg 3 has a native asyncio mode)
+ASYNC_CAPABLE_DRIVERS = frozenset(ASYNC_DRIVERS.values()) | {"psycopg"}
+
+def _async_url(url: str) -> str:
+    """Swap the configured URL's driver for its asyncio counterpart, unless it already has one"""
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver and url.get_driver_name() not in ASYNC_CAPABLE_DRIVERS:
+        url = url.set(drivername=f"{url.get_backend_name()}+{driver}")
+    return url.render_as_string(hide_password=False)
+
+# Sync engine for table creation and migrations
+engine = create_engine(Config.DATABASE_URL, **_engine_options(Config.DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the API request path
+ASYNC_DATABASE_URL = _async_url(Config.DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+RETIRED_INDEXES = ("ix_logs_service", "ix_logs_severity", "ix_logs_timestamp", "ix_logs_timestamp_brin")
+
+def _convert_metadata_to_jsonb():
+    """Convert metadata columns created as text by older versions to JSONB in place"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column in (("logs", "log_metadata"), ("anomalies", "anomaly_metadata")):
+            column_types = {col["name"]: col["type"] for col in inspector.get_columns(table)}
+            if not isinstance(column_types.get(column), JSONB):
+                conn.execute(text(
+                    f"ALTER TABLE {table} ALTER COLUMN {column} TYPE jsonb USING {column}::jsonb"
+                ))
+
+def create_partition(month: date):
+    """Create the logs partition covering the calendar month that contains `month`"""
+    start = month.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS logs_{start:%Y_%m} PARTITION OF logs "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+
+def _logs_is_partitioned() -> bool:
+    """Whether the existing logs table was created partitioned; create_all
+    leaves an older unpartitioned table as it is"""
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'logs'::regclass"
+        )).first() is not None
+
+def ensure_partitions(months_ahead: int = 1):
+    """Create this month's logs partition and the next `months_ahead`; run periodically
+    (e.g. from cron) so a partition always exists before its month starts.
+    
+    There is no DEFAULT partition: rows landing there would block creating the
+    partition for their month later, so inserts outside the created months fail instead.
+    """
+    if not _logs_is_partitioned():
+        logger.warning("PARTITION_LOGS is set but the logs table is not partitioned; skipping partitions")
+        return
+    
+    month = datetime.utcnow().date().replace(day=1)
+    for _ in range(months_ahead + 1):
+        create_partition(month)
+        month = (month + timedelta(days=32)).replace(day=1)
+
 def create_tables():
     Base.metadata.create_all(bind=engine)
+    
+    if PARTITION_LOGS:
+        ensure_partitions()
+    
+    if engine.dialect.name == "postgresql":
+        _convert_metadata_to_jsonb()
+    
+    # create_all skips tables that already exist, so add any newly declared indexes
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    
+    # Indexes superseded by the (timestamp, ...) composites
+    with engine.begin() as conn:
+        for name in RETIRED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
 
 def get_db():
     db = SessionLocal()
@@ -58,3 +219,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
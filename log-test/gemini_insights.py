@@ -1,96 +1,424 @@
 import google.generativeai as genai
-import json
+import orjson
 import asyncio
-from datetime import datetime, timedelta
+import functools
+import hashlib
+import heapq
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from itertools import islice
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
+import numpy as np
 import pandas as pd
 from config import Config
 
+logger = logging.getLogger(__name__)
+
+GEMINI_MODEL = 'gemini-2.0-flash-001'
+
+ERROR_SEVERITIES = frozenset({'ERROR', 'CRITICAL'})
+MAX_SERVICES_IN_PROMPT = 10
+CHARS_PER_TOKEN = 4  # rough average for English log text
+
+# Static persona and deliverables for each analysis type. They are sent once
+# per model as the system instruction, so each request carries only the data.
+SYSTEM_INSTRUCTIONS = {
+    "pattern_analysis": """As a DevOps engineer and log analysis expert, analyze the log data you are given and provide insights.
+
+Please provide a comprehensive analysis including:
+
+1. **Overall Health Assessment**: Rate the system health (1-10) and explain why
+2. **Key Patterns**: Identify any notable patterns in the logs
+3. **Potential Issues**: Highlight any concerning trends or anomalies
+4. **Service Performance**: Analyze individual service performance
+5. **Recommendations**: Provide actionable recommendations for improvement
+6. **Risk Assessment**: Identify potential risks and their severity
+
+Format your response as a structured analysis with clear sections and actionable insights.
+Keep the analysis concise but comprehensive, focusing on the most important findings.""",
+
+    "anomaly_insights": """As a senior DevOps engineer, analyze the detected anomalies you are given, along with recent context logs, and provide actionable insights.
+
+Please provide:
+
+1. **Anomaly Assessment**: Evaluate the severity and impact of each anomaly
+2. **Root Cause Analysis**: Suggest potential root causes for the anomalies
+3. **Immediate Actions**: Recommend immediate steps to address the issues
+4. **Prevention Strategies**: Suggest ways to prevent similar anomalies
+5. **Monitoring Improvements**: Recommend monitoring enhancements
+6. **Priority Ranking**: Rank the anomalies by urgency and impact
+
+Focus on practical, actionable advice that a DevOps team can implement immediately.""",
+
+    "daily_summary": """As a DevOps team lead, create a comprehensive daily summary report based on the log data you are given.
+
+Please provide:
+
+1. **Executive Summary**: High-level overview of system health and key metrics
+2. **Performance Highlights**: Notable performance achievements or issues
+3. **Incident Summary**: Any incidents, anomalies, or issues that occurred
+4. **Trends Analysis**: Key trends compared to previous periods
+5. **Action Items**: Specific tasks for the team to address
+6. **Recommendations**: Strategic recommendations for system improvement
+7. **Health Score**: Overall system health score (1-10) with justification
+
+Format this as a professional daily report suitable for both technical and management audiences.""",
+
+    "optimization_suggestions": """As a senior system architect and performance engineer, analyze the log data you are given and provide optimization recommendations.
+
+Please provide:
+
+1. **Performance Bottlenecks**: Identify performance bottlenecks and their impact
+2. **Resource Optimization**: Suggest resource allocation improvements
+3. **Error Reduction**: Recommend strategies to reduce error rates
+4. **Monitoring Enhancements**: Suggest monitoring and alerting improvements
+5. **Infrastructure Changes**: Recommend infrastructure or configuration changes
+6. **Code Quality**: Suggest code quality improvements based on error patterns
+7. **Capacity Planning**: Provide capacity planning recommendations
+8. **Cost Optimization**: Suggest ways to optimize costs while maintaining performance
+
+Focus on practical, implementable recommendations with clear business impact.""",
+
+    "anomaly_explanation": """As a senior incident response engineer, provide a detailed analysis of the anomaly you are given.
+
+Please provide:
+
+1. **Anomaly Explanation**: What this anomaly means and why it occurred
+2. **Impact Assessment**: Potential impact on system and users
+3. **Root Cause Analysis**: Most likely root causes
+4. **Immediate Response**: Steps to take immediately
+5. **Investigation Steps**: How to investigate further
+6. **Prevention Measures**: How to prevent similar anomalies
+7. **Monitoring Improvements**: How to better detect such anomalies
+
+Provide a thorough, technical analysis suitable for incident response teams.""",
+}
+
+# Per-request prompt layouts; only these dynamic parts are sent (and hashed
+# for the response cache), the static instructions live in SYSTEM_INSTRUCTIONS
+PROMPT_TEMPLATES = {
+    "pattern_analysis": "{stats}\n\n{logs}",
+    "anomaly_insights": "{anomalies}\nRecent Context Logs:\n{logs}",
+    "daily_summary": "{stats}{anomalies}",
+    "optimization_suggestions": "{stats}\n{errors}",
+    "anomaly_explanation": "{anomaly}{context}",
+}
+
+ANOMALY_DETAILS_TEMPLATE = """Anomaly Details:
+Type: {type}
+Severity: {severity}
+Service: {service}
+Confidence: {confidence:.2f}
+Description: {description}
+Timestamp: {timestamp}
+"""
+
+@functools.lru_cache(maxsize=None)
+def _generation_fingerprint(analysis_type: str) -> str:
+    """Digest of everything besides the prompt data that shapes a response of this type
+    (model, system instruction and prompt layout); cached responses are only reused under it"""
+    parts = (analysis_type, GEMINI_MODEL, SYSTEM_INSTRUCTIONS.get(analysis_type, ""), PROMPT_TEMPLATES.get(analysis_type, ""))
+    return hashlib.blake2b("\0".join(parts).encode(), digest_size=16).hexdigest()
+
+def _compact_json(value) -> str:
+    """Serialize metadata without whitespace; pretty-printing only costs prompt tokens"""
+    return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
 class GeminiInsights:
     def __init__(self):
         self.api_key = Config.GEMINI_API_KEY
         if self.api_key:
             genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-2.0-flash-001')
+            self.model = genai.GenerativeModel(GEMINI_MODEL)
+            self._models = {
+                analysis_type: genai.GenerativeModel(GEMINI_MODEL, system_instruction=instruction)
+                for analysis_type, instruction in SYSTEM_INSTRUCTIONS.items()
+            }
         else:
             self.model = None
+            self._models = {}
             print("Gemini API key not configured")
-
-    def _format_logs_for_analysis(self, logs: List[Dict], max_logs: int = 100) -> str:
-        """Format logs for LLM analysis"""
+        
+        # LRU of response text keyed by (analysis_type, prompt digest)
+        self._response_cache = OrderedDict()
+        # Normalized prompt embeddings, their responses and creation times (epoch
+        # seconds) per generation fingerprint, so near-duplicate prompts (e.g. stats
+        # off by a few counts) also hit while the response is still fresh
+        self._cache_vectors: Dict[str, np.ndarray] = {}
+        self._cache_responses: Dict[str, List[str]] = {}
+        self._cache_times: Dict[str, np.ndarray] = {}
+        # Cache outcome counts, overall ("hit") and per type ("daily_summary_hit")
+        self._stats = Counter()
+        # One on-disk cache connection, opened on first use; writes run in worker
+        # threads, so they are serialized by the lock
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._load_semantic_cache()
+
+    async def _generate(self, analysis_type: str, prompt: str) -> str:
+        """Generate a response, reusing the cached text for a repeated prompt"""
+        key = (analysis_type, hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest())
+        cached = self._response_cache.get(key)
+        if cached is not None:
+            self._response_cache.move_to_end(key)
+            self._record_cache(analysis_type, "hit")
+            return cached
+        
+        vector = await self._embed(prompt)
+        text = self._semantic_lookup(analysis_type, vector)
+        if text is None:
+            self._record_cache(analysis_type, "miss")
+            model = self._models.get(analysis_type, self.model)
+            response = await model.generate_content_async(prompt)
+            text = response.text
+            if self._semantic_store(analysis_type, vector, text):
+                # Keep the disk write off the event loop the analyses share
+                await asyncio.to_thread(self._persist_semantic_entry, analysis_type, key[1], vector, text)
+        else:
+            self._record_cache(analysis_type, "semantic_hit")
+        
+        self._response_cache[key] = text
+        if len(self._response_cache) > Config.GEMINI_CACHE_SIZE:
+            self._response_cache.popitem(last=False)
+        return text
+
+    def _record_cache(self, analysis_type: str, outcome: str):
+        """Count a cache outcome and log the running totals"""
+        self._stats[f"{analysis_type}_{outcome}"] += 1
+        self._stats[outcome] += 1
+        lookups = self._stats["hit"] + self._stats["semantic_hit"] + self._stats["miss"]
+        logger.info(
+            "Gemini cache %s for %s: hit=%d semantic_hit=%d miss=%d hit_rate=%.2f",
+            outcome, analysis_type, self._stats["hit"], self._stats["semantic_hit"], self._stats["miss"],
+            (lookups - self._stats["miss"]) / lookups
+        )
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Cache hit/miss counts, overall and per analysis type"""
+        return dict(self._stats)
+
+    async def _embed(self, prompt: str) -> Optional[np.ndarray]:
+        """L2-normalized prompt embedding, or None if disabled or the embedding call fails"""
+        if Config.GEMINI_SEMANTIC_THRESHOLD > 1:
+            return None
+        try:
+            result = await genai.embed_content_async(model=Config.GEMINI_EMBEDDING_MODEL, content=prompt)
+        except Exception:
+            return None
+        vector = np.asarray(result['embedding'], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _semantic_lookup(self, analysis_type: str, vector: Optional[np.ndarray]) -> Optional[str]:
+        """Response of the most similar unexpired cached prompt above the similarity threshold"""
+        fingerprint = _generation_fingerprint(analysis_type)
+        vectors = self._cache_vectors.get(fingerprint)
+        if vector is None or vectors is None or vectors.shape[1] != vector.shape[0]:
+            return None
+        fresh = self._cache_times[fingerprint] >= time.time() - Config.GEMINI_CACHE_TTL
+        sims = np.where(fresh, vectors @ vector, -np.inf)
+        best = int(np.argmax(sims))
+        if sims[best] >= Config.GEMINI_SEMANTIC_THRESHOLD:
+            return self._cache_responses[fingerprint][best]
+        return None
+
+    def _semantic_store(self, analysis_type: str, vector: Optional[np.ndarray], text: str) -> bool:
+        """Remember a response under its prompt embedding, dropping the oldest past the cap;
+        returns whether it was stored"""
+        if vector is None:
+            return False
+        fingerprint = _generation_fingerprint(analysis_type)
+        vectors = self._cache_vectors.get(fingerprint)
+        if vectors is None or vectors.shape[1] != vector.shape[0]:
+            vectors, responses, times = np.empty((0, vector.shape[0]), dtype=np.float32), [], np.empty(0)
+        else:
+            responses, times = self._cache_responses[fingerprint], self._cache_times[fingerprint]
+        
+        limit = Config.GEMINI_SEMANTIC_CACHE_SIZE
+        self._cache_vectors[fingerprint] = np.vstack([vectors, vector])[-limit:]
+        self._cache_responses[fingerprint] = (responses + [text])[-limit:]
+        self._cache_times[fingerprint] = np.append(times, time.time())[-limit:]
+        return True
+
+    def _cache_db(self) -> sqlite3.Connection:
+        """The on-disk semantic cache connection, opened and its table created on first use;
+        call with self._db_lock held"""
+        if self._db is None:
+            path = Config.GEMINI_CACHE_PATH
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False)
+            # Tables from before generation fingerprints can't tell which responses are
+            # still valid; it is only a cache, so start it over
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(gemini_cache)")}
+            if columns and "fingerprint" not in columns:
+                conn.execute("DROP TABLE gemini_cache")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS gemini_cache ("
+                "key TEXT PRIMARY KEY, analysis_type TEXT NOT NULL, model TEXT NOT NULL, "
+                "fingerprint TEXT NOT NULL, embedding BLOB NOT NULL, response TEXT NOT NULL, "
+                "created_at INTEGER NOT NULL)"
+            )
+            self._db = conn
+        return self._db
+
+    def _load_semantic_cache(self):
+        """Restore the newest unexpired semantic cache entries per analysis type from disk,
+        skipping ones generated under another model, instruction or prompt layout"""
+        path = Config.GEMINI_CACHE_PATH
+        if not path or not os.path.exists(path):
+            return
+        
+        try:
+            with self._db_lock:
+                rows = self._cache_db().execute(
+                    "SELECT analysis_type, fingerprint, embedding, response, created_at FROM gemini_cache "
+                    "WHERE model = ? AND created_at >= ? ORDER BY created_at",
+                    (Config.GEMINI_EMBEDDING_MODEL, time.time_ns() - Config.GEMINI_CACHE_TTL * 10**9)
+                ).fetchall()
+        except Exception:
+            logger.exception("Error loading Gemini semantic cache")
+            return
+        
+        by_fingerprint: Dict[str, list] = {}
+        for analysis_type, fingerprint, embedding, response, created_at in rows:
+            if fingerprint == _generation_fingerprint(analysis_type):
+                by_fingerprint.setdefault(fingerprint, []).append((embedding, response, created_at / 1e9))
+        
+        for fingerprint, entries in by_fingerprint.items():
+            entries = entries[-Config.GEMINI_SEMANTIC_CACHE_SIZE:]
+            # Vectors are stored as float16 to halve their size; widen for the dot products
+            vectors = [np.frombuffer(embedding, dtype=np.float16) for embedding, _, _ in entries]
+            dims = vectors[-1].shape[0]
+            keep = [i for i, vector in enumerate(vectors) if vector.shape[0] == dims]
+            self._cache_vectors[fingerprint] = np.vstack([vectors[i] for i in keep]).astype(np.float32)
+            self._cache_responses[fingerprint] = [entries[i][1] for i in keep]
+            self._cache_times[fingerprint] = np.array([entries[i][2] for i in keep])
+        logger.info("Loaded %d Gemini semantic cache entries", sum(len(r) for r in self._cache_responses.values()))
+
+    def _persist_semantic_entry(self, analysis_type: str, digest: str, vector: np.ndarray, text: str):
+        """Write one semantic cache entry to disk, then drop its analysis type's expired,
+        outdated (other fingerprint) and beyond-the-cap entries"""
+        if not Config.GEMINI_CACHE_PATH:
+            return
+        
+        try:
+            # The lock is taken before the connection is fetched; the connection commits the pair
+            with self._db_lock, self._cache_db() as conn:
+                fingerprint = _generation_fingerprint(analysis_type)
+                now = time.time_ns()
+                conn.execute(
+                    "INSERT OR REPLACE INTO gemini_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (f"{analysis_type}:{digest}", analysis_type, Config.GEMINI_EMBEDDING_MODEL,
+                     fingerprint, vector.astype(np.float16).tobytes(), text, now)
+                )
+                conn.execute(
+                    "DELETE FROM gemini_cache WHERE analysis_type = ? AND ("
+                    "created_at < ? OR fingerprint != ? OR key NOT IN ("
+                    "SELECT key FROM gemini_cache WHERE analysis_type = ? ORDER BY created_at DESC LIMIT ?))",
+                    (analysis_type, now - Config.GEMINI_CACHE_TTL * 10**9, fingerprint,
+                     analysis_type, Config.GEMINI_SEMANTIC_CACHE_SIZE)
+                )
+        except Exception:
+            logger.exception("Error saving Gemini semantic cache entry")
+
+    def _format_log_entry(self, i: int, log: Dict) -> str:
+        """Format one numbered log entry for the prompt"""
+        entry = [
+            f"{i}. [{log.get('timestamp', 'N/A')}] "
+            f"{log.get('severity', 'UNKNOWN')} - "
+            f"{log.get('service', 'unknown')}: "
+            f"{log.get('message', 'No message')}\n"
+        ]
+        
+        if log.get('source_ip'):
+            entry.append(f"   Source IP: {log['source_ip']}\n")
+        if log.get('user_id'):
+            entry.append(f"   User ID: {log['user_id']}\n")
+        if log.get('metadata'):
+            entry.append(f"   Metadata: {_compact_json(log['metadata'])}\n")
+        entry.append("\n")
+        return "".join(entry)
+
+    def _format_logs_for_analysis(self, logs: List[Dict], max_logs: int = 100, max_tokens: int = 8000) -> str:
+        """Format logs for LLM analysis, stopping once the estimated token budget is spent"""
         if not logs:
             return "No logs available for analysis."
         
-        # Limit number of logs to avoid token limits
-        logs_to_analyze = logs[:max_logs]
+        # Collect fragments and join once instead of re-copying the text on every +=
+        parts = ["Recent Log Entries:\n", "=" * 50, "\n"]
         
-        formatted_logs = "Recent Log Entries:\n"
-        formatted_logs += "=" * 50 + "\n"
+        # A few long messages (e.g. stack traces) can outweigh many short ones,
+        # so the budget is counted in estimated tokens rather than entries
+        budget = max_tokens * CHARS_PER_TOKEN
         
-        for i, log in enumerate(logs_to_analyze, 1):
-            formatted_logs += f"{i}. [{log.get('timestamp', 'N/A')}] "
-            formatted_logs += f"{log.get('severity', 'UNKNOWN')} - "
-            formatted_logs += f"{log.get('service', 'unknown')}: "
-            formatted_logs += f"{log.get('message', 'No message')}\n"
-            
-            if log.get('source_ip'):
-                formatted_logs += f"   Source IP: {log['source_ip']}\n"
-            if log.get('user_id'):
-                formatted_logs += f"   User ID: {log['user_id']}\n"
-            if log.get('metadata'):
-                formatted_logs += f"   Metadata: {json.dumps(log['metadata'], indent=2)}\n"
-            formatted_logs += "\n"
+        # Limit number of logs to avoid token limits, without copying the list.
+        # Entries are formatted lazily, so however large the batch, only the
+        # entries that fit the budget (plus one) are ever formatted.
+        for i, log in enumerate(islice(logs, max_logs), 1):
+            entry_text = self._format_log_entry(i, log)
+            budget -= len(entry_text)
+            if budget < 0:
+                parts.append(f"... {min(len(logs), max_logs) - i + 1} more log entries omitted to stay within the prompt budget\n")
+                break
+            parts.append(entry_text)
         
-        return formatted_logs
+        return "".join(parts)
 
     def _format_statistics_for_analysis(self, stats: Dict) -> str:
         """Format statistics for LLM analysis"""
         if not stats:
             return "No statistics available."
         
-        formatted_stats = "Log Statistics:\n"
-        formatted_stats += "=" * 30 + "\n"
+        parts = ["Log Statistics:\n", "=" * 30, "\n"]
         
         # Time range
         if 'time_range' in stats:
             time_range = stats['time_range']
-            formatted_stats += f"Time Range: {time_range.get('start', 'N/A')} to {time_range.get('end', 'N/A')}\n"
-            formatted_stats += f"Duration: {time_range.get('hours', 'N/A')} hours\n\n"
+            parts.append(f"Time Range: {time_range.get('start', 'N/A')} to {time_range.get('end', 'N/A')}\n")
+            parts.append(f"Duration: {time_range.get('hours', 'N/A')} hours\n\n")
         
         # Total logs
-        formatted_stats += f"Total Logs: {stats.get('total_logs', 0):,}\n\n"
+        parts.append(f"Total Logs: {stats.get('total_logs', 0):,}\n\n")
         
         # Severity distribution
         severity_dist = stats.get('severity_distribution', {})
         if severity_dist:
-            formatted_stats += "Severity Distribution:\n"
+            parts.append("Severity Distribution:\n")
             for severity, count in severity_dist.items():
                 percentage = (count / stats.get('total_logs', 1)) * 100
-                formatted_stats += f"  {severity}: {count:,} ({percentage:.1f}%)\n"
-            formatted_stats += "\n"
+                parts.append(f"  {severity}: {count:,} ({percentage:.1f}%)\n")
+            parts.append("\n")
         
         # Service distribution
         service_dist = stats.get('service_distribution', {})
         if service_dist:
-            formatted_stats += "Service Distribution:\n"
-            sorted_services = sorted(service_dist.items(), key=lambda x: x[1], reverse=True)
-            for service, count in sorted_services:
+            parts.append("Service Distribution:\n")
+            top_services = heapq.nlargest(MAX_SERVICES_IN_PROMPT, service_dist.items(), key=lambda x: x[1])
+            for service, count in top_services:
                 percentage = (count / stats.get('total_logs', 1)) * 100
-                formatted_stats += f"  {service}: {count:,} ({percentage:.1f}%)\n"
-            formatted_stats += "\n"
+                parts.append(f"  {service}: {count:,} ({percentage:.1f}%)\n")
+            if len(service_dist) > len(top_services):
+                other_logs = sum(service_dist.values()) - sum(count for _, count in top_services)
+                parts.append(f"  ({len(service_dist) - len(top_services)} other services: {other_logs:,} logs)\n")
+            parts.append("\n")
         
         # Hourly distribution (top 5)
         hourly_dist = stats.get('hourly_distribution', {})
         if hourly_dist:
-            formatted_stats += "Peak Hours (Top 5):\n"
-            sorted_hours = sorted(hourly_dist.items(), key=lambda x: x[1], reverse=True)[:5]
+            parts.append("Peak Hours (Top 5):\n")
+            sorted_hours = heapq.nlargest(5, hourly_dist.items(), key=lambda x: x[1])
             for hour, count in sorted_hours:
-                formatted_stats += f"  {hour}: {count:,} logs\n"
-            formatted_stats += "\n"
+                parts.append(f"  {hour}: {count:,} logs\n")
+            parts.append("\n")
         
-        return formatted_stats
+        return "".join(parts)
 
-    async def analyze_log_patterns(self, logs: List[Dict], stats: Dict) -> Dict:
+    async def analyze_log_patterns(self, logs: List[Dict], stats: Dict, stats_text: Optional[str] = None) -> Dict:
         """Analyze log patterns and provide insights"""
         if not self.model:
             return {"error": "Gemini API not configured"}
@@ -98,35 +426,18 @@ class GeminiInsights:
         try:
             # Format data for analysis
             logs_text = self._format_logs_for_analysis(logs)
-            stats_text = self._format_statistics_for_analysis(stats)
+            if stats_text is None:
+                stats_text = self._format_statistics_for_analysis(stats)
             
             # Create prompt for pattern analysis
-            prompt = f"""
-            As a DevOps engineer and log analysis expert, analyze the following log data and provide insights:
-
-            {stats_text}
-
-            {logs_text}
-
-            Please provide a comprehensive analysis including:
-
-            1. **Overall Health Assessment**: Rate the system health (1-10) and explain why
-            2. **Key Patterns**: Identify any notable patterns in the logs
-            3. **Potential Issues**: Highlight any concerning trends or anomalies
-            4. **Service Performance**: Analyze individual service performance
-            5. **Recommendations**: Provide actionable recommendations for improvement
-            6. **Risk Assessment**: Identify potential risks and their severity
-
-            Format your response as a structured analysis with clear sections and actionable insights.
-            Keep the analysis concise but comprehensive, focusing on the most important findings.
-            """
+            prompt = PROMPT_TEMPLATES["pattern_analysis"].format(stats=stats_text, logs=logs_text)
             
             # Generate response
-            response = await asyncio.to_thread(self.model.generate_content, prompt)
+            text = await self._generate("pattern_analysis", prompt)
             
             return {
-                "analysis": response.text,
-                "timestamp": datetime.utcnow().isoformat(),
+                "analysis": text,
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
                 "logs_analyzed": len(logs),
                 "analysis_type": "pattern_analysis"
             }
@@ -141,48 +452,29 @@ class GeminiInsights:
         
         try:
             # Format anomalies for analysis
-            anomalies_text = "Detected Anomalies:\n"
-            anomalies_text += "=" * 30 + "\n"
-            
-            for i, anomaly in enumerate(anomalies, 1):
-                anomalies_text += f"{i}. Type: {anomaly.get('type', 'Unknown')}\n"
-                anomalies_text += f"   Severity: {anomaly.get('severity', 'Unknown')}\n"
-                anomalies_text += f"   Service: {anomaly.get('affected_service', 'Unknown')}\n"
-                anomalies_text += f"   Confidence: {anomaly.get('confidence_score', 0):.2f}\n"
-                anomalies_text += f"   Description: {anomaly.get('description', 'No description')}\n"
-                anomalies_text += f"   Timestamp: {anomaly.get('timestamp', 'Unknown')}\n\n"
+            anomalies_text = "Detected Anomalies:\n" + "=" * 30 + "\n" + "".join(
+                f"{i}. Type: {anomaly.get('type', 'Unknown')}\n"
+                f"   Severity: {anomaly.get('severity', 'Unknown')}\n"
+                f"   Service: {anomaly.get('affected_service', 'Unknown')}\n"
+                f"   Confidence: {anomaly.get('confidence_score', 0):.2f}\n"
+                f"   Description: {anomaly.get('description', 'No description')}\n"
+                f"   Timestamp: {anomaly.get('timestamp', 'Unknown')}\n\n"
+                for i, anomaly in enumerate(anomalies, 1)
+            )
             
             # Get recent logs for context
             recent_logs = logs[-20:] if logs else []
             logs_text = self._format_logs_for_analysis(recent_logs, 20)
             
             # Create prompt for anomaly analysis
-            prompt = f"""
-            As a senior DevOps engineer, analyze these detected anomalies and provide actionable insights:
-
-            {anomalies_text}
-
-            Recent Context Logs:
-            {logs_text}
-
-            Please provide:
-
-            1. **Anomaly Assessment**: Evaluate the severity and impact of each anomaly
-            2. **Root Cause Analysis**: Suggest potential root causes for the anomalies
-            3. **Immediate Actions**: Recommend immediate steps to address the issues
-            4. **Prevention Strategies**: Suggest ways to prevent similar anomalies
-            5. **Monitoring Improvements**: Recommend monitoring enhancements
-            6. **Priority Ranking**: Rank the anomalies by urgency and impact
-
-            Focus on practical, actionable advice that a DevOps team can implement immediately.
-            """
+            prompt = PROMPT_TEMPLATES["anomaly_insights"].format(anomalies=anomalies_text, logs=logs_text)
             
             # Generate response
-            response = await asyncio.to_thread(self.model.generate_content, prompt)
+            text = await self._generate("anomaly_insights", prompt)
             
             return {
-                "insights": response.text,
-                "timestamp": datetime.utcnow().isoformat(),
+                "insights": text,
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
                 "anomalies_analyzed": len(anomalies),
                 "analysis_type": "anomaly_insights"
             }
@@ -190,48 +482,33 @@ class GeminiInsights:
         except Exception as e:
             return {"error": f"Anomaly analysis failed: {str(e)}"}
 
-    async def generate_daily_summary(self, stats: Dict, anomalies: List[Dict] = None) -> Dict:
+    async def generate_daily_summary(self, stats: Dict, anomalies: List[Dict] = None, stats_text: Optional[str] = None) -> Dict:
         """Generate a daily summary report"""
         if not self.model:
             return {"error": "Gemini API not configured"}
         
         try:
             # Format statistics
-            stats_text = self._format_statistics_for_analysis(stats)
+            if stats_text is None:
+                stats_text = self._format_statistics_for_analysis(stats)
             
             # Format anomalies if provided
             anomalies_text = ""
             if anomalies:
-                anomalies_text = f"\nAnomalies Detected: {len(anomalies)}\n"
-                for anomaly in anomalies[:5]:  # Top 5 anomalies
-                    anomalies_text += f"- {anomaly.get('type', 'Unknown')}: {anomaly.get('description', 'No description')}\n"
+                anomalies_text = f"\nAnomalies Detected: {len(anomalies)}\n" + "".join(
+                    f"- {anomaly.get('type', 'Unknown')}: {anomaly.get('description', 'No description')}\n"
+                    for anomaly in anomalies[:5]  # Top 5 anomalies
+                )
             
             # Create prompt for daily summary
-            prompt = f"""
-            As a DevOps team lead, create a comprehensive daily summary report based on this log data:
-
-            {stats_text}
-            {anomalies_text}
-
-            Please provide:
-
-            1. **Executive Summary**: High-level overview of system health and key metrics
-            2. **Performance Highlights**: Notable performance achievements or issues
-            3. **Incident Summary**: Any incidents, anomalies, or issues that occurred
-            4. **Trends Analysis**: Key trends compared to previous periods
-            5. **Action Items**: Specific tasks for the team to address
-            6. **Recommendations**: Strategic recommendations for system improvement
-            7. **Health Score**: Overall system health score (1-10) with justification
-
-            Format this as a professional daily report suitable for both technical and management audiences.
-            """
+            prompt = PROMPT_TEMPLATES["daily_summary"].format(stats=stats_text, anomalies=anomalies_text)
             
             # Generate response
-            response = await asyncio.to_thread(self.model.generate_content, prompt)
+            text = await self._generate("daily_summary", prompt)
             
             return {
-                "summary": response.text,
-                "timestamp": datetime.utcnow().isoformat(),
+                "summary": text,
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
                 "report_type": "daily_summary",
                 "total_logs": stats.get('total_logs', 0),
                 "anomalies_count": len(anomalies) if anomalies else 0
@@ -240,15 +517,20 @@ class GeminiInsights:
         except Exception as e:
             return {"error": f"Daily summary generation failed: {str(e)}"}
 
-    async def suggest_optimizations(self, logs: List[Dict], stats: Dict) -> Dict:
+    async def suggest_optimizations(self, logs: List[Dict], stats: Dict, stats_text: Optional[str] = None) -> Dict:
         """Suggest system optimizations based on log analysis"""
         if not self.model:
             return {"error": "Gemini API not configured"}
         
         try:
-            # Analyze error patterns
-            error_logs = [log for log in logs if log.get('severity') in ['ERROR', 'CRITICAL']]
-            warning_logs = [log for log in logs if log.get('severity') == 'WARNING']
+            # Analyze error patterns, splitting errors and warnings in one pass
+            error_logs, warning_logs = [], []
+            for log in logs:
+                severity = log.get('severity')
+                if severity in ERROR_SEVERITIES:
+                    error_logs.append(log)
+                elif severity == 'WARNING':
+                    warning_logs.append(log)
             
             # Format error analysis
             error_analysis = f"Error Analysis:\n"
@@ -261,36 +543,18 @@ class GeminiInsights:
                     error_analysis += f"- {error.get('service', 'Unknown')}: {error.get('message', 'No message')}\n"
             
             # Format statistics
-            stats_text = self._format_statistics_for_analysis(stats)
+            if stats_text is None:
+                stats_text = self._format_statistics_for_analysis(stats)
             
             # Create prompt for optimization suggestions
-            prompt = f"""
-            As a senior system architect and performance engineer, analyze this log data and provide optimization recommendations:
-
-            {stats_text}
-
-            {error_analysis}
-
-            Please provide:
-
-            1. **Performance Bottlenecks**: Identify performance bottlenecks and their impact
-            2. **Resource Optimization**: Suggest resource allocation improvements
-            3. **Error Reduction**: Recommend strategies to reduce error rates
-            4. **Monitoring Enhancements**: Suggest monitoring and alerting improvements
-            5. **Infrastructure Changes**: Recommend infrastructure or configuration changes
-            6. **Code Quality**: Suggest code quality improvements based on error patterns
-            7. **Capacity Planning**: Provide capacity planning recommendations
-            8. **Cost Optimization**: Suggest ways to optimize costs while maintaining performance
-
-            Focus on practical, implementable recommendations with clear business impact.
-            """
+            prompt = PROMPT_TEMPLATES["optimization_suggestions"].format(stats=stats_text, errors=error_analysis)
             
             # Generate response
-            response = await asyncio.to_thread(self.model.generate_content, prompt)
+            text = await self._generate("optimization_suggestions", prompt)
             
             return {
-                "recommendations": response.text,
-                "timestamp": datetime.utcnow().isoformat(),
+                "recommendations": text,
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
                 "analysis_type": "optimization_suggestions",
                 "errors_analyzed": len(error_logs),
                 "warnings_analyzed": len(warning_logs)
@@ -306,18 +570,17 @@ class GeminiInsights:
         
         try:
             # Format anomaly details
-            anomaly_text = f"""
-            Anomaly Details:
-            Type: {anomaly.get('type', 'Unknown')}
-            Severity: {anomaly.get('severity', 'Unknown')}
-            Service: {anomaly.get('affected_service', 'Unknown')}
-            Confidence: {anomaly.get('confidence_score', 0):.2f}
-            Description: {anomaly.get('description', 'No description')}
-            Timestamp: {anomaly.get('timestamp', 'Unknown')}
-            """
+            anomaly_text = ANOMALY_DETAILS_TEMPLATE.format(
+                type=anomaly.get('type', 'Unknown'),
+                severity=anomaly.get('severity', 'Unknown'),
+                service=anomaly.get('affected_service', 'Unknown'),
+                confidence=anomaly.get('confidence_score', 0),
+                description=anomaly.get('description', 'No description'),
+                timestamp=anomaly.get('timestamp', 'Unknown')
+            )
             
             if anomaly.get('metadata'):
-                anomaly_text += f"\nMetadata: {json.dumps(anomaly['metadata'], indent=2)}"
+                anomaly_text += f"Metadata: {_compact_json(anomaly['metadata'])}\n"
             
             # Add context logs if provided
             context_text = ""
@@ -326,31 +589,14 @@ class GeminiInsights:
                 context_text += self._format_logs_for_analysis(context_logs, 20)
             
             # Create prompt for anomaly explanation
-            prompt = f"""
-            As a senior incident response engineer, provide a detailed analysis of this anomaly:
-
-            {anomaly_text}
-            {context_text}
-
-            Please provide:
-
-            1. **Anomaly Explanation**: What this anomaly means and why it occurred
-            2. **Impact Assessment**: Potential impact on system and users
-            3. **Root Cause Analysis**: Most likely root causes
-            4. **Immediate Response**: Steps to take immediately
-            5. **Investigation Steps**: How to investigate further
-            6. **Prevention Measures**: How to prevent similar anomalies
-            7. **Monitoring Improvements**: How to better detect such anomalies
-
-            Provide a thorough, technical analysis suitable for incident response teams.
-            """
+            prompt = PROMPT_TEMPLATES["anomaly_explanation"].format(anomaly=anomaly_text, context=context_text)
             
             # Generate response
-            response = await asyncio.to_thread(self.model.generate_content, prompt)
+            text = await self._generate("anomaly_explanation", prompt)
             
             return {
-                "explanation": response.text,
-                "timestamp": datetime.utcnow().isoformat(),
+                "explanation": text,
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
                 "anomaly_type": anomaly.get('type', 'Unknown'),
                 "analysis_type": "anomaly_explanation"
             }
@@ -358,6 +604,24 @@ class GeminiInsights:
         except Exception as e:
             return {"error": f"Anomaly explanation failed: {str(e)}"}
 
+    async def run_full_report(self, logs: List[Dict], stats: Dict, anomalies: List[Dict] = None) -> Dict[str, Dict]:
+        """Run the pattern, anomaly, summary and optimization analyses concurrently"""
+        anomalies = anomalies or []
+        # Three of the analyses share the same statistics text; format it once
+        stats_text = self._format_statistics_for_analysis(stats)
+        names = ("pattern_analysis", "anomaly_insights", "daily_summary", "optimization_suggestions")
+        results = await asyncio.gather(
+            self.analyze_log_patterns(logs, stats, stats_text),
+            self.generate_anomaly_insights(anomalies, logs),
+            self.generate_daily_summary(stats, anomalies, stats_text),
+            self.suggest_optimizations(logs, stats, stats_text),
+            return_exceptions=True
+        )
+        return {
+            name: {"error": f"{name} failed: {result}"} if isinstance(result, BaseException) else result
+            for name, result in zip(names, results)
+        }
+
 # Example usage and testing
 async def main():
     """Test the Gemini insights functionality"""
@@ -415,7 +679,13 @@ async def main():
     print(summary.get('summary', 'No summary available'))
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # uvloop's libuv-based loop has lower scheduling overhead; optional
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
 
 
 
@@ -1,17 +1,91 @@
+import asyncio
 import random
-import time
+import string
 import json
 import threading
+from bisect import bisect_right
 from datetime import datetime, timedelta
-from typing import Dict, List
-import requests
+from itertools import accumulate
+from typing import Callable, Dict, List, Optional
+import aiohttp
+import numpy as np
+import orjson
 from config import Config
 
+ENVIRONMENTS = ("production", "staging", "development")
+REGIONS = ("us-east-1", "us-west-2", "eu-west-1", "ap-southeast-1")
+# Every v1.0.0-v3.9.9 version string, so metadata picks one instead of formatting three draws
+SERVICE_VERSIONS = tuple(f"v{major}.{minor}.{patch}" for major in range(1, 4) for minor in range(10) for patch in range(10))
+ERROR_SEVERITIES = frozenset({"ERROR", "CRITICAL"})
+SEVERITY_RESOLUTION = 1 << 30
+
+def _random_ip(rng) -> str:
+    # One 32-bit draw sliced into octets; a zero octet is bumped to 1 to keep the 1-255 range
+    n = rng.getrandbits(32)
+    return f"{(n >> 24) or 1}.{((n >> 16) & 0xff) or 1}.{((n >> 8) & 0xff) or 1}.{(n & 0xff) or 1}"
+
+# Value generators for the {placeholders} used in log templates
+FIELD_GENERATORS = {
+    "duration": lambda rng: rng.randint(10, 5000),
+    "pool_size": lambda rng: rng.randint(10, 100),
+    "table": lambda rng: f"table_{rng.randint(1, 20)}",
+    "percentage": lambda rng: rng.randint(60, 95),
+    "query": lambda rng: f"SELECT * FROM users WHERE id = {rng.randint(1, 10000)}",
+    "user_id": lambda rng: f"user_{rng.randint(1000, 9999)}",
+    "error": lambda rng: rng.choice([
+        "Connection timeout", "Invalid credentials", "Resource not found",
+        "Permission denied", "Internal server error", "Network unreachable"
+    ]),
+    "source_ip": _random_ip,
+    "endpoint": lambda rng: rng.choice(["/api/users", "/api/orders", "/api/products", "/api/auth"]),
+    "filename": lambda rng: f"file_{rng.randint(1, 1000)}.txt",
+    "resource": lambda rng: f"/resource/{rng.randint(1, 100)}",
+    "current": lambda rng: rng.randint(1, 100),
+    "limit": lambda rng: 100,
+    "cache_key": lambda rng: f"cache_{rng.randint(1, 1000)}",
+    "port": lambda rng: rng.choice([3000, 8000, 8080, 9000]),
+    "cpu": lambda rng: rng.randint(20, 80),
+    "memory": lambda rng: rng.randint(30, 85),
+    "size": lambda rng: rng.randint(1, 100)
+}
+
+def _compile_template(template: str) -> Callable:
+    """Turn a template into a function of the RNG that draws only the fields it uses"""
+    pieces = list(string.Formatter().parse(template))
+    fields = [field for _, field, _, _ in pieces if field is not None]
+    if not fields:
+        text = "".join(literal for literal, _, _, _ in pieces)
+        return lambda rng: text
+    if any(field not in FIELD_GENERATORS for field in fields):
+        return lambda rng: template
+    
+    literals = [literal for literal, _, _, _ in pieces]
+    generators = [FIELD_GENERATORS[field] if field is not None else None for _, field, _, _ in pieces]
+    if len(fields) == 1 and generators[0] is not None:
+        # Common case: one placeholder, optionally followed by trailing text
+        prefix, generator = literals[0], generators[0]
+        suffix = "".join(literals[1:])
+        return lambda rng: f"{prefix}{generator(rng)}{suffix}"
+    
+    def fill(rng) -> str:
+        parts = []
+        for literal, generator in zip(literals, generators):
+            parts.append(literal)
+            if generator is not None:
+                parts.append(str(generator(rng)))
+        return "".join(parts)
+    return fill
+
 class LogGenerator:
+    # Below this size the fixed cost of the NumPy draw outweighs the per-entry savings
+    VECTORIZED_BATCH_MIN = 8
+    
     def __init__(self):
         self.running = False
         self.api_url = f"http://{Config.API_HOST}:{Config.API_PORT}/api/logs"
         
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        
         # Realistic log templates for different services and severities
         self.log_templates = {
             "database": {
@@ -147,148 +221,205 @@ class LogGenerator:
                 "ERROR": [f"{service.title()} service error: {{error}}", f"{service.title()} operation failed"],
                 "CRITICAL": [f"{service.title()} service down", f"{service.title()} critical failure"]
             }
+        
+        # Cumulative severity weights, so sampling is one bisect instead of a scan
+        self._severity_population = list(Config.SEVERITY_WEIGHTS)
+        self._severity_cum_weights = list(accumulate(Config.SEVERITY_WEIGHTS.values()))
+        self._severity_total = self._severity_cum_weights[-1]
+        self._severity_probs = np.array(list(Config.SEVERITY_WEIGHTS.values())) / self._severity_total
+        
+        # Dedicated RNG with its methods pre-bound, so hot paths skip module attribute lookups
+        self._rng = random.Random()
+        self._randint = self._rng.randint
+        self._choice = self._rng.choice
+        self._random = self._rng.random
+        self._getrandbits = self._rng.getrandbits
+        
+        # Vectorized RNG for drawing a whole batch's independent fields at once
+        self._np_rng = np.random.default_rng()
+        # Column bounds for generate_logs_batch's single draw: service, severity, four IP
+        # octets, user presence (<7 of 10), user id, request id, version, environment,
+        # region, instance id, error code
+        bounds = [
+            (0, len(Config.SERVICES)), (0, SEVERITY_RESOLUTION),
+            (1, 256), (1, 256), (1, 256), (1, 256),
+            (0, 10), (1000, 10000), (100000, 1000000),
+            (0, len(SERVICE_VERSIONS)), (0, len(ENVIRONMENTS)), (0, len(REGIONS)),
+            (10000000, 100000000), (1000, 10000)
+        ]
+        self._batch_lows, self._batch_highs = (np.array(column) for column in zip(*bounds))
+        # Severity draws in [0, SEVERITY_RESOLUTION) map to an index via the cumulative weights
+        self._severity_bounds = np.cumsum(self._severity_probs)[:-1] * SEVERITY_RESOLUTION
+        
+        # Templates compiled once into fillers, so each entry skips format parsing
+        # and draws random values only for the placeholders its template uses.
+        # Keyed flat by (service, severity) so each pick is one dict lookup on a tuple
+        self._template_fillers = {
+            (service, severity): tuple(_compile_template(template) for template in templates)
+            for service, by_severity in self.log_templates.items()
+            for severity, templates in by_severity.items()
+        }
 
-    def generate_log_entry(self) -> Dict:
-        """Generate a single realistic log entry"""
+    def generate_log_entry(self, timestamp: Optional[str] = None) -> Dict:
+        """Generate a single realistic log entry, optionally with a precomputed ISO timestamp"""
         # Select service and severity based on weights
-        service = random.choice(Config.SERVICES)
+        choice = self._choice
+        service = choice(Config.SERVICES)
         severity = self._select_severity()
         
         # Get template and fill it with realistic data
-        template = random.choice(self.log_templates[service][severity])
-        message = self._fill_template(template, service, severity)
+        message = choice(self._template_fillers[service, severity])(self._rng)
         
         # Generate metadata
         metadata = self._generate_metadata(service, severity)
         
         return {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": timestamp or datetime.utcnow().isoformat(),
             "service": service,
             "severity": severity,
             "message": message,
             "source_ip": self._generate_ip(),
-            "user_id": self._generate_user_id() if random.random() < 0.7 else None,
+            "user_id": self._generate_user_id() if self._random() < 0.7 else None,
             "request_id": self._generate_request_id(),
             "metadata": metadata
         }
 
     def _select_severity(self) -> str:
         """Select severity based on configured weights"""
-        rand = random.random()
-        cumulative = 0
-        for severity, weight in Config.SEVERITY_WEIGHTS.items():
-            cumulative += weight
-            if rand <= cumulative:
-                return severity
-        return "INFO"
-
-    def _fill_template(self, template: str, service: str, severity: str) -> str:
-        """Fill template with realistic values"""
-        replacements = {
-            "duration": random.randint(10, 5000),
-            "pool_size": random.randint(10, 100),
-            "table": f"table_{random.randint(1, 20)}",
-            "percentage": random.randint(60, 95),
-            "query": f"SELECT * FROM users WHERE id = {random.randint(1, 10000)}",
-            "user_id": f"user_{random.randint(1000, 9999)}",
-            "error": random.choice([
-                "Connection timeout", "Invalid credentials", "Resource not found",
-                "Permission denied", "Internal server error", "Network unreachable"
-            ]),
-            "source_ip": self._generate_ip(),
-            "endpoint": random.choice(["/api/users", "/api/orders", "/api/products", "/api/auth"]),
-            "filename": f"file_{random.randint(1, 1000)}.txt",
-            "resource": f"/resource/{random.randint(1, 100)}",
-            "current": random.randint(1, 100),
-            "limit": 100,
-            "cache_key": f"cache_{random.randint(1, 1000)}",
-            "port": random.choice([3000, 8000, 8080, 9000]),
-            "cpu": random.randint(20, 80),
-            "memory": random.randint(30, 85),
-            "size": random.randint(1, 100)
-        }
-        
-        try:
-            return template.format(**replacements)
-        except KeyError:
-            return template
+        index = bisect_right(self._severity_cum_weights, self._random() * self._severity_total)
+        return self._severity_population[index]
 
     def _generate_metadata(self, service: str, severity: str) -> Dict:
         """Generate realistic metadata for the log entry"""
+        choice, getrandbits = self._choice, self._getrandbits
         metadata = {
-            "service_version": f"v{random.randint(1, 3)}.{random.randint(0, 9)}.{random.randint(0, 9)}",
-            "environment": random.choice(["production", "staging", "development"]),
-            "region": random.choice(["us-east-1", "us-west-2", "eu-west-1", "ap-southeast-1"]),
-            "instance_id": f"i-{random.randint(10000000, 99999999)}"
+            "service_version": choice(SERVICE_VERSIONS),
+            "environment": choice(ENVIRONMENTS),
+            "region": choice(REGIONS),
+            "instance_id": f"i-{10000000 + getrandbits(32) % 90000000}"
         }
         
-        if severity in ["ERROR", "CRITICAL"]:
-            metadata["error_code"] = f"ERR_{random.randint(1000, 9999)}"
+        if severity in ERROR_SEVERITIES:
+            metadata["error_code"] = f"ERR_{1000 + getrandbits(32) % 9000}"
             metadata["stack_trace"] = "Stack trace available in error logs"
         
         return metadata
 
     def _generate_ip(self) -> str:
         """Generate realistic IP address"""
-        return f"{random.randint(1, 255)}.{random.randint(1, 255)}.{random.randint(1, 255)}.{random.randint(1, 255)}"
+        return _random_ip(self._rng)
 
     def _generate_user_id(self) -> str:
         """Generate realistic user ID"""
-        return f"user_{random.randint(1000, 9999)}"
+        return f"user_{1000 + self._getrandbits(32) % 9000}"
 
     def _generate_request_id(self) -> str:
         """Generate realistic request ID"""
-        return f"req_{random.randint(100000, 999999)}"
+        return f"req_{100000 + self._getrandbits(32) % 900000}"
 
-    def send_logs_to_api(self, logs: List[Dict]) -> bool:
-        """Send generated logs to the API"""
-        try:
-            response = requests.post(
-                self.api_url,
-                json={"logs": logs},
-                headers={"Content-Type": "application/json"},
-                timeout=5
-            )
-            return response.status_code == 200
-        except Exception as e:
-            print(f"Failed to send logs to API: {e}")
-            return False
-
-    def generate_logs_batch(self) -> List[Dict]:
-        """Generate a batch of logs"""
-        batch_size = random.randint(1, Config.MAX_LOGS_PER_BATCH)
-        return [self.generate_log_entry() for _ in range(batch_size)]
+    def generate_logs_batch(self, batch_size: Optional[int] = None) -> List[Dict]:
+        """Generate a batch of logs, drawing every random field for the batch in one go"""
+        n = batch_size or self._randint(1, Config.MAX_LOGS_PER_BATCH)
+        # Entries in a batch are generated microseconds apart, so they share one timestamp
+        timestamp = datetime.utcnow().isoformat()
+        if n < self.VECTORIZED_BATCH_MIN:
+            return [self.generate_log_entry(timestamp) for _ in range(n)]
+        # Every random field of the batch as one (n, columns) integer draw, unpacked column-wise
+        columns = self._np_rng.integers(self._batch_lows, self._batch_highs, (n, len(self._batch_lows)))
+        columns[:, 1] = np.searchsorted(self._severity_bounds, columns[:, 1], side="right")
+        
+        services, severities = Config.SERVICES, self._severity_population
+        fillers, choice, rng = self._template_fillers, self._choice, self._rng
+        logs = []
+        for (service_idx, severity_idx, a, b, c, d, user_draw, user_id, request_id,
+             version_idx, environment_idx, region_idx, instance_id, error_code) in zip(*columns.T.tolist()):
+            service = services[service_idx]
+            severity = severities[severity_idx]
+            metadata = {
+                "service_version": SERVICE_VERSIONS[version_idx],
+                "environment": ENVIRONMENTS[environment_idx],
+                "region": REGIONS[region_idx],
+                "instance_id": f"i-{instance_id}"
+            }
+            if severity in ERROR_SEVERITIES:
+                metadata["error_code"] = f"ERR_{error_code}"
+                metadata["stack_trace"] = "Stack trace available in error logs"
+            
+            logs.append({
+                "timestamp": timestamp,
+                "service": service,
+                "severity": severity,
+                "message": choice(fillers[service, severity])(rng),
+                "source_ip": f"{a}.{b}.{c}.{d}",
+                "user_id": f"user_{user_id}" if user_draw < 7 else None,
+                "request_id": f"req_{request_id}",
+                "metadata": metadata
+            })
+        return logs
 
     def start_generation(self):
         """Start continuous log generation"""
+        try:
+            asyncio.run(self._run())
+        except KeyboardInterrupt:
+            print("Log generation stopped by user")
+
+    async def _run(self):
+        """Generate batches and send them concurrently, so a slow POST never delays the next batch"""
         self.running = True
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=2)
         print("Starting log generation...")
         
-        while self.running:
+        connector = aiohttp.TCPConnector(limit=4)
+        async with aiohttp.ClientSession(
+            connector=connector,
+            headers={"Content-Type": "application/json"},
+            timeout=aiohttp.ClientTimeout(total=5)
+        ) as session:
+            self._producer = asyncio.create_task(self._produce())
+            try:
+                await self._consume(session)
+            finally:
+                self._producer.cancel()
+                self._loop = None
+
+    async def _produce(self):
+        """Queue a new batch every interval until stopped, then signal the consumer"""
+        try:
+            while self.running:
+                try:
+                    await self._queue.put(self.generate_logs_batch())
+                    await asyncio.sleep(Config.LOG_GENERATION_INTERVAL)
+                except Exception as e:
+                    print(f"Error in log generation: {e}")
+                    await asyncio.sleep(5)  # Wait before retrying
+        finally:
+            await self._queue.put(None)
+
+    async def _consume(self, session: aiohttp.ClientSession):
+        """Send queued batches to the API until the producer signals the end"""
+        while (logs := await self._queue.get()) is not None:
             try:
-                # Generate batch of logs
-                logs = self.generate_logs_batch()
-                
-                # Send to API
-                success = self.send_logs_to_api(logs)
-                if success:
-                    print(f"Generated and sent {len(logs)} logs")
-                else:
-                    print(f"Failed to send {len(logs)} logs")
-                
-                # Wait before next batch
-                time.sleep(Config.LOG_GENERATION_INTERVAL)
-                
-            except KeyboardInterrupt:
-                print("Log generation stopped by user")
-                break
+                async with session.post(self.api_url, data=orjson.dumps({"logs": logs})) as response:
+                    await response.read()  # drain the body so the connection is kept alive
+                    success = response.status == 200
             except Exception as e:
-                print(f"Error in log generation: {e}")
-                time.sleep(5)  # Wait before retrying
+                print(f"Failed to send logs to API: {e}")
+                success = False
+            
+            if success:
+                print(f"Generated and sent {len(logs)} logs")
+            else:
+                print(f"Failed to send {len(logs)} logs")
 
     def stop_generation(self):
         """Stop log generation"""
         self.running = False
+        # Wake the producer from its interval sleep; safe to call from any thread
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(self._producer.cancel)
         print("Stopping log generation...")
 
 def main():
@@ -0,0 +1,31 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+from config import Config
+
+_listener = None
+
+def setup_logging():
+    """Configure root logging to hand records off through a queue.
+
+    Callers only enqueue records; a background QueueListener thread does the
+    actual (blocking) write to stderr, so error storms inside async handlers
+    don't stall the event loop on the stream lock.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    
+    log_queue = queue.SimpleQueue()
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+    
+    root_logger = logging.getLogger()
+    root_logger.setLevel(Config.LOG_LEVEL)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
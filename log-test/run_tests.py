@@ -4,8 +4,11 @@ Test script for LogOps Analyzer components
 """
 
 import asyncio
+import io
 import sys
 import os
+from collections import Counter
+from contextvars import ContextVar
 from datetime import datetime
 import json
 
@@ -13,10 +16,24 @@ import json
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from config import Config
-from telegram_alerter import TelegramAlerter
+from telegram_alerter import TelegramAlerter, close_shared_session
 from gemini_insights import GeminiInsights
 from anomaly_detector import AnomalyDetector
 
+# Output buffer of the test running in the current task or worker thread
+_test_output: ContextVar[io.StringIO] = ContextVar("test_output")
+
+class _PerTestStdout:
+    """stdout that writes into the current test's buffer, so concurrent tests don't interleave"""
+    def __init__(self, stream):
+        self._stream = stream
+    
+    def write(self, text):
+        return _test_output.get(self._stream).write(text)
+    
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
 def test_config():
     """Test configuration loading"""
     print("🔧 Testing configuration...")
@@ -62,6 +79,7 @@ async def test_telegram_alerter():
             print("⚠️  Telegram not configured (missing bot token or chat ID)")
         
         await alerter.close()
+        await close_shared_session()
         return True
     except Exception as e:
         print(f"❌ Telegram alerter test failed: {e}")
@@ -142,6 +160,7 @@ def test_anomaly_detector():
         # Test feature extraction
         features = detector.extract_features(test_logs)
         assert features.shape[0] == len(test_logs), "Feature extraction should return one row per log"
+        assert features.dtype.name == "float32", "Feature matrix should be float32"
         
         # Test volume anomaly detection
         volume_anomalies = detector.detect_volume_anomalies(test_logs)
@@ -173,14 +192,15 @@ def test_log_generator():
         for field in required_fields:
             assert field in log_entry, f"Log entry should contain {field}"
         
-        # Test severity distribution
-        severities = []
-        for _ in range(100):
-            log = generator.generate_log_entry()
-            severities.append(log['severity'])
+        # Test severity distribution on one batch, exercising the vectorized path
+        batch = generator.generate_logs_batch(100)
+        assert len(batch) == 100, "Batch should contain the requested number of logs"
+        for log in batch:
+            for field in required_fields:
+                assert field in log, f"Batch log entry should contain {field}"
         
         # Check if severity distribution is reasonable
-        severity_counts = {s: severities.count(s) for s in set(severities)}
+        severity_counts = Counter(log['severity'] for log in batch)
         info_count = severity_counts.get('INFO', 0)
         assert info_count > 40, "INFO logs should be most common"
         
@@ -230,6 +250,33 @@ def test_database():
         print(f"❌ Database test failed: {e}")
         return False
 
+def test_dashboard_tables():
+    """Test the dashboard's recent logs table"""
+    print("📋 Testing dashboard tables...")
+    
+    try:
+        from dashboard import _recent_logs_frame, _severity_cell_styles
+        
+        logs = [
+            {"timestamp": datetime.utcnow().isoformat(), "service": "api", "severity": severity,
+             "message": "Test message", "source_ip": None, "user_id": None, "metadata": {}}
+            for severity in ("INFO", "DEBUG", "CRITICAL")
+        ]
+        df = _recent_logs_frame(logs)
+        
+        # Severities outside the known levels keep their value and stay unstyled
+        assert list(df['severity']) == ["INFO", "DEBUG", "CRITICAL"], "Severities should be preserved"
+        styles = _severity_cell_styles(df['severity'])
+        assert styles.iloc[1] == '', "Unknown severities should not be colored"
+        assert styles.iloc[0] and styles.iloc[2], "Known severities should be colored"
+        df.style.apply(_severity_cell_styles, subset=['severity']).to_html()
+        
+        print("✅ Dashboard tables test passed")
+        return True
+    except Exception as e:
+        print(f"❌ Dashboard tables test failed: {e}")
+        return False
+
 async def run_all_tests():
     """Run all tests"""
     print("🧪 Running LogOps Analyzer Tests")
@@ -240,23 +287,40 @@ async def run_all_tests():
         ("Database", test_database),
         ("Log Generator", test_log_generator),
         ("Anomaly Detector", test_anomaly_detector),
+        ("Dashboard Tables", test_dashboard_tables),
         ("Gemini Insights", test_gemini_insights),
         ("Telegram Alerter", test_telegram_alerter),
     ]
     
-    results = []
-    
-    for test_name, test_func in tests:
-        print(f"\n🔍 Running {test_name} test...")
+    async def run_test(test_name, test_func):
+        # Each gathered task (and worker thread) has its own context, hence its own buffer
+        output = io.StringIO()
+        _test_output.set(output)
         try:
             if asyncio.iscoroutinefunction(test_func):
                 result = await test_func()
             else:
-                result = test_func()
-            results.append((test_name, result))
+                # Sync tests run in worker threads so they overlap with the network-bound ones
+                result = await asyncio.to_thread(test_func)
         except Exception as e:
             print(f"❌ {test_name} test failed with exception: {e}")
-            results.append((test_name, False))
+            result = False
+        return result, output.getvalue()
+    
+    # The tests are independent, so run them concurrently; output is printed per
+    # test afterwards, and results keep the declared order
+    stdout = sys.stdout
+    sys.stdout = _PerTestStdout(stdout)
+    try:
+        outcomes = await asyncio.gather(*(run_test(name, func) for name, func in tests))
+    finally:
+        sys.stdout = stdout
+    
+    results = []
+    for (test_name, _), (result, output) in zip(tests, outcomes):
+        print(f"\n🔍 Running {test_name} test...")
+        print(output, end="")
+        results.append((test_name, result))
     
     # Summary
     print("\n" + "=" * 50)
@@ -3,27 +3,30 @@
 Setup script for LogOps Analyzer
 """
 
-import os
+import hashlib
 import sys
 import subprocess
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-def create_directories():
-    """Create necessary directories"""
-    directories = ['data', 'logs', 'ssl']
-    for directory in directories:
-        Path(directory).mkdir(exist_ok=True)
-        print(f"✅ Created directory: {directory}")
+# Fingerprint of the last successful dependency install
+SETUP_CACHE_FILE = Path('.setup_cache')
 
-def create_env_file():
-    """Create .env file from template"""
-    env_content = """# Gemini API Configuration
+# Generated file contents
+ENV_TEMPLATE = """# Gemini API Configuration
 GEMINI_API_KEY=your_gemini_api_key_here
+GEMINI_CACHE_SIZE=256
+GEMINI_EMBEDDING_MODEL=models/text-embedding-004
+GEMINI_SEMANTIC_CACHE_SIZE=512
+GEMINI_SEMANTIC_THRESHOLD=0.95
+GEMINI_CACHE_PATH=./data/gemini_cache.db
+GEMINI_CACHE_TTL=21600
 
 # Telegram Bot Configuration
 TELEGRAM_BOT_TOKEN=your_telegram_bot_token_here
 TELEGRAM_CHAT_ID=your_telegram_chat_id_here
+TELEGRAM_BATCH_WINDOW=2.0
 
 # Application Configuration
 LOG_LEVEL=INFO
@@ -32,48 +35,23 @@ API_HOST=0.0.0.0
 API_PORT=8000
 STREAMLIT_PORT=8501
 
+# Database Connection Pool Configuration
+DB_POOL_SIZE=10
+DB_MAX_OVERFLOW=20
+DB_POOL_RECYCLE=1800
+DB_STATEMENT_CACHE_SIZE=256
+PARTITION_LOGS=false
+
 # Alerting Configuration
 ERROR_THRESHOLD=10
 CRITICAL_THRESHOLD=5
 ANOMALY_THRESHOLD=0.8
-"""
-    
-    env_file = Path('.env')
-    if not env_file.exists():
-        with open(env_file, 'w') as f:
-            f.write(env_content)
-        print("✅ Created .env file")
-    else:
-        print("ℹ️  .env file already exists")
 
-def install_dependencies():
-    """Install Python dependencies"""
-    try:
-        subprocess.run([sys.executable, '-m', 'pip', 'install', '-r', 'requirements.txt'], 
-                      check=True, capture_output=True)
-        print("✅ Dependencies installed successfully")
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Failed to install dependencies: {e}")
-        return False
-    return True
-
-def check_docker():
-    """Check if Docker is installed and running"""
-    try:
-        subprocess.run(['docker', '--version'], check=True, capture_output=True)
-        subprocess.run(['docker-compose', '--version'], check=True, capture_output=True)
-        print("✅ Docker and Docker Compose are available")
-        return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("❌ Docker or Docker Compose not found")
-        print("   Please install Docker and Docker Compose to use containerized deployment")
-        return False
+# Anomaly Detection Configuration
+IFOREST_CACHE_PATH=./data/iforest.joblib
+"""
 
-def create_startup_scripts():
-    """Create startup scripts"""
-    
-    # Development startup script
-    dev_script = """#!/bin/bash
+DEV_SCRIPT = """#!/bin/bash
 echo "Starting LogOps Analyzer in development mode..."
 
 # Start API in background
@@ -93,14 +71,8 @@ streamlit run dashboard.py --server.port=8501 --server.address=0.0.0.0
 # Cleanup on exit
 trap "kill $API_PID $GENERATOR_PID" EXIT
 """
-    
-    with open('start_dev.sh', 'w') as f:
-        f.write(dev_script)
-    os.chmod('start_dev.sh', 0o755)
-    print("✅ Created start_dev.sh")
-    
-    # Production startup script
-    prod_script = """#!/bin/bash
+
+PROD_SCRIPT = """#!/bin/bash
 echo "Starting LogOps Analyzer in production mode..."
 
 # Build and start with Docker Compose
@@ -113,15 +85,8 @@ echo ""
 echo "To view logs: docker-compose logs -f"
 echo "To stop: docker-compose down"
 """
-    
-    with open('start_prod.sh', 'w') as f:
-        f.write(prod_script)
-    os.chmod('start_prod.sh', 0o755)
-    print("✅ Created start_prod.sh")
 
-def create_readme():
-    """Create README.md file"""
-    readme_content = """# LogOps Analyzer
+README_CONTENT = """# LogOps Analyzer
 
 A comprehensive log monitoring and analysis system with real-time insights, anomaly detection, and AI-powered recommendations.
 
@@ -303,21 +268,115 @@ For issues and questions:
 - Check the documentation
 - Review the API docs at http://localhost:8000/docs
 """
+
+def _report(message: str):
+    """Print a status line in a single write, so lines from parallel setup steps don't interleave"""
+    sys.stdout.write(f"{message}\n")
+
+def create_directories():
+    """Create necessary directories"""
+    for directory in ('data', 'logs', 'ssl'):
+        path = Path(directory)
+        # Existing directories cost one stat and are left alone
+        if not path.is_dir():
+            path.mkdir(exist_ok=True)
+            _report(f"✅ Created directory: {directory}")
+
+def create_env_file():
+    """Create .env file from template"""
+    # Create the file exclusively, so an existing .env is never overwritten
+    env_file = Path('.env')
+    try:
+        f = env_file.open('x', encoding='utf-8')
+    except FileExistsError:
+        _report("ℹ️  .env file already exists")
+        return
+    try:
+        with f:
+            f.write(ENV_TEMPLATE)
+    except BaseException:
+        # Don't leave a partial .env behind that later runs would take as set up
+        env_file.unlink(missing_ok=True)
+        raise
+    _report("✅ Created .env file")
+
+def install_dependencies():
+    """Install Python dependencies, skipping pip when requirements are unchanged since the last install"""
+    # Keyed on the interpreter too, so a new virtualenv still gets a full install
+    fingerprint = hashlib.sha256(
+        Path('requirements.txt').read_bytes() + sys.executable.encode()
+    ).hexdigest()
+    if SETUP_CACHE_FILE.exists() and SETUP_CACHE_FILE.read_text().strip() == fingerprint:
+        print("✅ Dependencies up-to-date (cached)")
+        return True
     
-    with open('README.md', 'w') as f:
-        f.write(readme_content)
-    print("✅ Created README.md")
+    # uv resolves and installs in parallel; fall back to pip when it isn't available
+    uv = shutil.which('uv')
+    if uv:
+        command = [uv, 'pip', 'install', '--python', sys.executable, '-r', 'requirements.txt']
+    else:
+        command = [sys.executable, '-m', 'pip', 'install', '--no-input', '--disable-pip-version-check',
+                   '--prefer-binary', '-r', 'requirements.txt']
+    
+    try:
+        subprocess.run(command, check=True, capture_output=True)
+        print("✅ Dependencies installed successfully")
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Failed to install dependencies: {e}")
+        return False
+    SETUP_CACHE_FILE.write_text(fingerprint)
+    return True
+
+def check_docker(check_daemon: bool = False):
+    """Check if Docker is installed, and optionally that its daemon is running"""
+    # A PATH lookup is enough to know the binaries exist; no process is spawned
+    if not (shutil.which('docker') and shutil.which('docker-compose')):
+        print("❌ Docker or Docker Compose not found")
+        print("   Please install Docker and Docker Compose to use containerized deployment")
+        return False
+    
+    if check_daemon:
+        try:
+            subprocess.run(['docker', 'info'], check=True, capture_output=True)
+        except subprocess.CalledProcessError:
+            print("❌ Docker is installed but the daemon is not running")
+            return False
+    
+    print("✅ Docker and Docker Compose are available")
+    return True
+
+def create_startup_scripts():
+    """Create startup scripts"""
+    # Development startup script
+    dev_path = Path('start_dev.sh')
+    dev_path.write_text(DEV_SCRIPT, encoding='utf-8')
+    dev_path.chmod(0o755)
+    _report("✅ Created start_dev.sh")
+    
+    # Production startup script
+    prod_path = Path('start_prod.sh')
+    prod_path.write_text(PROD_SCRIPT, encoding='utf-8')
+    prod_path.chmod(0o755)
+    _report("✅ Created start_prod.sh")
+
+def create_readme():
+    """Create README.md file"""
+    Path('README.md').write_text(README_CONTENT, encoding='utf-8')
+    _report("✅ Created README.md")
 
 def main():
     """Main setup function"""
     print("🚀 Setting up LogOps Analyzer...")
     print("=" * 50)
     
-    # Create directories
-    create_directories()
-    
-    # Create environment file
-    create_env_file()
+    # Create directories, environment file, startup scripts and README; the
+    # contents are independent, so the file writes overlap in worker threads
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(step) for step in (
+            create_directories, create_env_file, create_startup_scripts, create_readme
+        )]
+        for future in futures:
+            future.result()
     
     # Install dependencies
     if not install_dependencies():
@@ -325,13 +384,7 @@ def main():
         return False
     
     # Check Docker
-    docker_available = check_docker()
-    
-    # Create startup scripts
-    create_startup_scripts()
-    
-    # Create README
-    create_readme()
+    docker_available = check_docker(check_daemon='--check-docker-daemon' in sys.argv)
     
     print("=" * 50)
     print("✅ Setup completed successfully!")
@@ -1,28 +1,144 @@
 import asyncio
-import aiohttp
-import json
+import heapq
+import html
+import orjson
+import time
+from collections import OrderedDict
+from operator import itemgetter
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 from config import Config
 
+if TYPE_CHECKING:
+    import aiohttp
+
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+JSON_HEADERS = {"Content-Type": "application/json"}
+SEND_RETRIES = 3  # extra sendMessage attempts after a 429 or 5xx response
+ALERT_BATCH_SEPARATOR = "\n\n---\n\n"
+
+def _escape(value) -> str:
+    """Render a dynamic value as text that Telegram's HTML parse mode shows verbatim"""
+    return html.escape(str(value), quote=False)
+
+SEVERITY_EMOJIS = {"INFO": "ℹ️", "WARNING": "⚠️", "ERROR": "❌", "CRITICAL": "💥"}
+
+# Emoji mapping for different alert types
+ALERT_EMOJIS = {
+    "error_spike": "🚨",
+    "critical_spike": "🔴",
+    "volume_spike": "📈",
+    "service_down": "⚠️",
+    "anomaly": "🔍",
+    "high_error_rate": "❌",
+    "high_critical_rate": "💥"
+}
+# Display titles for the known alert types, e.g. "error_spike" -> "Error Spike"
+ALERT_TYPE_TITLES = {alert_type: alert_type.replace('_', ' ').title() for alert_type in ALERT_EMOJIS}
+
+# Type-specific detail lines as one f-string per alert type; missing details render as N/A
+def _rate_details(details: Dict) -> str:
+    return (
+        f"📊 Rate: <code>{_escape(details.get('rate', 'N/A'))}</code>\n"
+        f"📈 Expected: <code>{_escape(details.get('expected_rate', 'N/A'))}</code>\n"
+        f"🔧 Service: <code>{_escape(details.get('service', 'N/A'))}</code>\n"
+    )
+
+ALERT_DETAIL_FORMATTERS = {
+    "error_spike": lambda details: (
+        f"❌ Error Count: <code>{_escape(details.get('error_count', 'N/A'))}</code>\n"
+        f"📈 Threshold: <code>{_escape(details.get('threshold', 'N/A'))}</code>\n"
+    ),
+    "critical_spike": lambda details: (
+        f"💥 Critical Count: <code>{_escape(details.get('critical_count', 'N/A'))}</code>\n"
+        f"📈 Threshold: <code>{_escape(details.get('threshold', 'N/A'))}</code>\n"
+    ),
+    "volume_spike": lambda details: (
+        f"📊 Volume: <code>{_escape(details.get('volume', 'N/A'))}</code> logs\n"
+        f"📈 Normal: <code>{_escape(details.get('normal_volume', 'N/A'))}</code> ± <code>{_escape(details.get('std_volume', 'N/A'))}</code>\n"
+        f"📊 Z-Score: <code>{_escape(details.get('z_score', 'N/A'))}</code>\n"
+    ),
+    "service_down": lambda details: (
+        f"🔧 Service: <code>{_escape(details.get('service', 'N/A'))}</code>\n"
+        f"⏱️ Downtime: <code>{_escape(details.get('downtime', 'N/A'))}</code>\n"
+    ),
+    "anomaly": lambda details: (
+        f"🔍 Confidence: <code>{_escape(details.get('confidence', 'N/A'))}</code>\n"
+        f"🔧 Service: <code>{_escape(details.get('service', 'N/A'))}</code>\n"
+        f"📝 Description: <code>{_escape(details.get('description', 'N/A'))}</code>\n"
+    ),
+    "high_error_rate": _rate_details,
+    "high_critical_rate": _rate_details,
+}
+
+# Alert timestamps only show whole seconds, so alerts in a burst share one formatted string
+_timestamp_cache = [0, ""]
+
+def _utc_timestamp() -> str:
+    """Current UTC time as shown in alerts, formatted at most once per second"""
+    now = int(time.time())
+    if now != _timestamp_cache[0]:
+        _timestamp_cache[0] = now
+        _timestamp_cache[1] = time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime(now))
+    return _timestamp_cache[1]
+
+# One pooled session per event loop, shared by every alerter on it, so DNS lookups
+# and keep-alive TLS connections to api.telegram.org are reused across alerts and instances
+_shared_sessions: Dict[asyncio.AbstractEventLoop, "aiohttp.ClientSession"] = {}
+
+async def get_shared_session() -> "aiohttp.ClientSession":
+    """Get the running event loop's shared Telegram session, creating it if needed"""
+    # Imported here so importing the module (e.g. at API startup) doesn't pay for aiohttp
+    import aiohttp
+    loop = asyncio.get_running_loop()
+    session = _shared_sessions.get(loop)
+    if session is None or session.closed:
+        # Release sessions left behind by event loops that have since closed
+        for old_loop in [old_loop for old_loop in _shared_sessions if old_loop.is_closed()]:
+            await _shared_sessions.pop(old_loop).close()
+        
+        session = _shared_sessions[loop] = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=10,
+                keepalive_timeout=75,
+                ttl_dns_cache=300,
+                enable_cleanup_closed=True
+            ),
+            timeout=aiohttp.ClientTimeout(total=10)
+        )
+    return session
+
+async def close_shared_session():
+    """Close the running event loop's shared Telegram session; call once at shutdown,
+    after every alerter on the loop is done (it reopens on next use)"""
+    session = _shared_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
 class TelegramAlerter:
     def __init__(self):
         self.bot_token = Config.TELEGRAM_BOT_TOKEN
         self.chat_id = Config.TELEGRAM_CHAT_ID
         self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
-        self.session = None
+        self._send_message_url = f"{self.base_url}/sendMessage"
+        self._get_me_url = f"{self.base_url}/getMe"
+        self._configured = bool(self.bot_token and self.chat_id)
         
-        # Rate limiting
-        self.last_alert_time = {}
+        # Rate limiting; monotonic send times per alert key, oldest evicted past the cap
+        self.last_alert_time = OrderedDict()
         self.alert_cooldown = 300  # 5 minutes cooldown between similar alerts
+        self._cooldown_max = 1024
+        
+        # Alerts raised within the batch window go out together as one message
+        self._pending: List[str] = []
+        self._pending_result: Optional[asyncio.Future] = None
+        self._flush_task: Optional[asyncio.Task] = None
 
     async def _get_session(self):
-        """Get or create aiohttp session"""
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
-        return self.session
+        """Get the shared aiohttp session"""
+        return await get_shared_session()
 
-    async def _send_message(self, message: str, parse_mode: str = "Markdown") -> bool:
+    async def _send_message(self, message: str, parse_mode: str = "HTML") -> bool:
         """Send a message to Telegram"""
         if not self.bot_token or not self.chat_id:
             print("Telegram bot token or chat ID not configured")
@@ -30,22 +146,36 @@ class TelegramAlerter:
         
         try:
             session = await self._get_session()
-            url = f"{self.base_url}/sendMessage"
             
-            payload = {
+            payload = orjson.dumps({
                 "chat_id": self.chat_id,
                 "text": message,
                 "parse_mode": parse_mode,
                 "disable_web_page_preview": True
-            }
+            })
             
-            async with session.post(url, json=payload) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    return result.get("ok", False)
-                else:
+            # Rate limits (429) wait the retry_after Telegram asks for; server errors back off
+            for attempt in range(SEND_RETRIES + 1):
+                async with session.post(self._send_message_url, data=payload, headers=JSON_HEADERS) as response:
+                    body = await response.read()
+                    if response.status == 200:
+                        return orjson.loads(body).get("ok", False)
+                    if attempt == SEND_RETRIES:
+                        delay = None
+                    elif response.status == 429:
+                        try:
+                            delay = orjson.loads(body)["parameters"]["retry_after"] + 0.1
+                        except (orjson.JSONDecodeError, KeyError, TypeError):
+                            delay = 1
+                    elif response.status >= 500:
+                        delay = 0.5 * 2 ** attempt
+                    else:
+                        delay = None
+                
+                if delay is None:
                     print(f"Telegram API error: {response.status}")
                     return False
+                await asyncio.sleep(delay)
                     
         except Exception as e:
             print(f"Error sending Telegram message: {e}")
@@ -53,82 +183,52 @@ class TelegramAlerter:
 
     def _format_alert_message(self, alert_type: str, details: Dict) -> str:
         """Format alert message for Telegram"""
-        timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
-        
-        # Emoji mapping for different alert types
-        emoji_map = {
-            "error_spike": "🚨",
-            "critical_spike": "🔴",
-            "volume_spike": "📈",
-            "service_down": "⚠️",
-            "anomaly": "🔍",
-            "high_error_rate": "❌",
-            "high_critical_rate": "💥"
-        }
-        
-        emoji = emoji_map.get(alert_type, "⚠️")
+        timestamp = _utc_timestamp()
         
-        # Base message
-        message = f"{emoji} *LogOps Alert*\n"
-        message += f"🕐 Time: `{timestamp}`\n"
-        message += f"📊 Type: `{alert_type.replace('_', ' ').title()}`\n"
-        
-        # Add specific details based on alert type
-        if alert_type == "error_spike":
-            message += f"❌ Error Count: `{details.get('error_count', 'N/A')}`\n"
-            message += f"📈 Threshold: `{details.get('threshold', 'N/A')}`\n"
-            
-        elif alert_type == "critical_spike":
-            message += f"💥 Critical Count: `{details.get('critical_count', 'N/A')}`\n"
-            message += f"📈 Threshold: `{details.get('threshold', 'N/A')}`\n"
-            
-        elif alert_type == "volume_spike":
-            message += f"📊 Volume: `{details.get('volume', 'N/A')}` logs\n"
-            message += f"📈 Normal: `{details.get('normal_volume', 'N/A')}` ± `{details.get('std_volume', 'N/A')}`\n"
-            message += f"📊 Z-Score: `{details.get('z_score', 'N/A')}`\n"
-            
-        elif alert_type == "service_down":
-            message += f"🔧 Service: `{details.get('service', 'N/A')}`\n"
-            message += f"⏱️ Downtime: `{details.get('downtime', 'N/A')}`\n"
-            
-        elif alert_type == "anomaly":
-            message += f"🔍 Confidence: `{details.get('confidence', 'N/A')}`\n"
-            message += f"🔧 Service: `{details.get('service', 'N/A')}`\n"
-            message += f"📝 Description: `{details.get('description', 'N/A')}`\n"
-            
-        elif alert_type in ["high_error_rate", "high_critical_rate"]:
-            message += f"📊 Rate: `{details.get('rate', 'N/A')}`\n"
-            message += f"📈 Expected: `{details.get('expected_rate', 'N/A')}`\n"
-            message += f"🔧 Service: `{details.get('service', 'N/A')}`\n"
+        # Header plus the alert type's precompiled detail lines
+        parts = [
+            f"{ALERT_EMOJIS.get(alert_type, '⚠️')} <b>LogOps Alert</b>\n"
+            f"🕐 Time: <code>{timestamp}</code>\n"
+            f"📊 Type: <code>{ALERT_TYPE_TITLES.get(alert_type) or _escape(alert_type.replace('_', ' ').title())}</code>\n"
+        ]
+        format_details = ALERT_DETAIL_FORMATTERS.get(alert_type)
+        if format_details is not None:
+            parts.append(format_details(details))
         
         # Add common details
         if details.get('affected_services'):
             services = ', '.join(details['affected_services'])
-            message += f"🔧 Affected Services: `{services}`\n"
+            parts.append(f"🔧 Affected Services: <code>{_escape(services)}</code>\n")
         
         if details.get('recommendation'):
-            message += f"\n💡 *Recommendation:*\n`{details['recommendation']}`\n"
+            parts.append(f"\n💡 <b>Recommendation:</b>\n<code>{_escape(details['recommendation'])}</code>\n")
         
         # Add footer
-        message += f"\n🔗 *LogOps Analyzer* - Real-time monitoring"
+        parts.append("\n🔗 <b>LogOps Analyzer</b> - Real-time monitoring")
         
-        return message
+        return "".join(parts)
 
     def _should_send_alert(self, alert_type: str, details: Dict) -> bool:
         """Check if alert should be sent based on cooldown and rate limiting"""
         alert_key = f"{alert_type}_{details.get('service', 'global')}"
-        current_time = datetime.utcnow().timestamp()
+        current_time = time.monotonic()
         
-        if alert_key in self.last_alert_time:
-            time_since_last = current_time - self.last_alert_time[alert_key]
-            if time_since_last < self.alert_cooldown:
-                return False
+        last_time = self.last_alert_time.get(alert_key)
+        if last_time is not None and current_time - last_time < self.alert_cooldown:
+            return False
         
         self.last_alert_time[alert_key] = current_time
+        self.last_alert_time.move_to_end(alert_key)
+        if len(self.last_alert_time) > self._cooldown_max:
+            self.last_alert_time.popitem(last=False)
         return True
 
     async def send_alert(self, message: str, alert_type: str = "general", details: Dict = None) -> bool:
         """Send an alert to Telegram"""
+        # Without a bot there is nowhere to send, so skip the cooldown and formatting work
+        if not self._configured:
+            return False
+        
         if details is None:
             details = {}
         
@@ -141,10 +241,10 @@ class TelegramAlerter:
         if alert_type != "general":
             formatted_message = self._format_alert_message(alert_type, details)
         else:
-            formatted_message = f"⚠️ *LogOps Alert*\n🕐 {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}\n\n{message}"
+            formatted_message = f"⚠️ <b>LogOps Alert</b>\n🕐 {_utc_timestamp()}\n\n{_escape(message)}"
         
-        # Send message
-        success = await self._send_message(formatted_message)
+        # Send message, batched with other alerts raised in the same window
+        success = await self._queue_message(formatted_message)
         
         if success:
             print(f"Alert sent successfully: {alert_type}")
@@ -153,6 +253,45 @@ class TelegramAlerter:
         
         return success
 
+    async def _queue_message(self, message: str) -> bool:
+        """Queue a message for the next batched send and wait for that send's result"""
+        if Config.TELEGRAM_BATCH_WINDOW <= 0:
+            return await self._send_message(message)
+        
+        self._pending.append(message)
+        if self._flush_task is None:
+            self._pending_result = asyncio.get_running_loop().create_future()
+            self._flush_task = asyncio.create_task(self._flush_after(Config.TELEGRAM_BATCH_WINDOW))
+        # Shielded so one cancelled caller doesn't cancel the result for the whole batch
+        return await asyncio.shield(self._pending_result)
+
+    async def _flush_after(self, delay: float):
+        """Send the pending batch once the window has elapsed"""
+        await asyncio.sleep(delay)
+        await self.flush()
+
+    async def flush(self) -> bool:
+        """Send all pending alerts now, split to fit Telegram's message size limit"""
+        messages, self._pending = self._pending, []
+        result, self._pending_result = self._pending_result, None
+        flush_task, self._flush_task = self._flush_task, None
+        if flush_task is not None and flush_task is not asyncio.current_task():
+            flush_task.cancel()
+        
+        success = True
+        batch = ""
+        for message in messages:
+            if batch and len(batch) + len(ALERT_BATCH_SEPARATOR) + len(message) > TELEGRAM_MAX_MESSAGE_LENGTH:
+                success = await self._send_message(batch) and success
+                batch = ""
+            batch = f"{batch}{ALERT_BATCH_SEPARATOR}{message}" if batch else message
+        if batch:
+            success = await self._send_message(batch) and success
+        
+        if result is not None and not result.done():
+            result.set_result(success)
+        return success
+
     async def send_error_spike_alert(self, error_count: int, threshold: int, services: List[str] = None) -> bool:
         """Send alert for error spike"""
         details = {
@@ -200,51 +339,60 @@ class TelegramAlerter:
 
     async def send_daily_summary(self, stats: Dict) -> bool:
         """Send daily summary report"""
+        if not self._configured:
+            return False
+        
         timestamp = datetime.utcnow().strftime("%Y-%m-%d")
         
-        message = f"📊 *Daily Log Summary - {timestamp}*\n\n"
+        parts = [f"📊 <b>Daily Log Summary - {timestamp}</b>\n\n"]
         
         # Total logs
         total_logs = stats.get("total_logs", 0)
-        message += f"📈 Total Logs: `{total_logs:,}`\n"
+        parts.append(f"📈 Total Logs: <code>{total_logs:,}</code>\n")
         
-        # Severity breakdown
+        # Severity breakdown; the same pass picks up the counts the health status needs
         severity_dist = stats.get("severity_distribution", {})
+        error_count = critical_count = 0
         if severity_dist:
-            message += "\n📊 *Severity Distribution:*\n"
+            parts.append("\n📊 <b>Severity Distribution:</b>\n")
             for severity, count in severity_dist.items():
+                if severity == "ERROR":
+                    error_count = count
+                elif severity == "CRITICAL":
+                    critical_count = count
                 percentage = (count / total_logs * 100) if total_logs > 0 else 0
-                emoji = {"INFO": "ℹ️", "WARNING": "⚠️", "ERROR": "❌", "CRITICAL": "💥"}.get(severity, "📝")
-                message += f"{emoji} {severity}: `{count:,}` ({percentage:.1f}%)\n"
+                emoji = SEVERITY_EMOJIS.get(severity, "📝")
+                parts.append(f"{emoji} {_escape(severity)}: <code>{count:,}</code> ({percentage:.1f}%)\n")
         
         # Service breakdown
         service_dist = stats.get("service_distribution", {})
         if service_dist:
-            message += "\n🔧 *Top Services:*\n"
-            sorted_services = sorted(service_dist.items(), key=lambda x: x[1], reverse=True)[:5]
+            parts.append("\n🔧 <b>Top Services:</b>\n")
+            # Partial selection of the top 5; same order as a full descending sort
+            sorted_services = heapq.nlargest(5, service_dist.items(), key=itemgetter(1))
             for service, count in sorted_services:
                 percentage = (count / total_logs * 100) if total_logs > 0 else 0
-                message += f"🔧 {service}: `{count:,}` ({percentage:.1f}%)\n"
+                parts.append(f"🔧 {_escape(service)}: <code>{count:,}</code> ({percentage:.1f}%)\n")
         
         # Anomalies detected
         anomalies = stats.get("anomalies_detected", 0)
         if anomalies > 0:
-            message += f"\n🔍 Anomalies Detected: `{anomalies}`\n"
+            parts.append(f"\n🔍 Anomalies Detected: <code>{anomalies}</code>\n")
         
         # Health status
-        error_rate = (severity_dist.get("ERROR", 0) / total_logs * 100) if total_logs > 0 else 0
-        critical_rate = (severity_dist.get("CRITICAL", 0) / total_logs * 100) if total_logs > 0 else 0
+        error_rate = (error_count / total_logs * 100) if total_logs > 0 else 0
+        critical_rate = (critical_count / total_logs * 100) if total_logs > 0 else 0
         
         if critical_rate > 1:
-            message += "\n🔴 *Status: Critical Issues Detected*\n"
+            parts.append("\n🔴 <b>Status: Critical Issues Detected</b>\n")
         elif error_rate > 5:
-            message += "\n⚠️ *Status: High Error Rate*\n"
+            parts.append("\n⚠️ <b>Status: High Error Rate</b>\n")
         else:
-            message += "\n✅ *Status: Healthy*\n"
+            parts.append("\n✅ <b>Status: Healthy</b>\n")
         
-        message += "\n🔗 *LogOps Analyzer* - Daily Report"
+        parts.append("\n🔗 <b>LogOps Analyzer</b> - Daily Report")
         
-        return await self._send_message(message)
+        return await self._send_message("".join(parts))
 
     async def test_connection(self) -> bool:
         """Test Telegram bot connection"""
@@ -254,11 +402,10 @@ class TelegramAlerter:
         
         try:
             session = await self._get_session()
-            url = f"{self.base_url}/getMe"
             
-            async with session.get(url) as response:
+            async with session.get(self._get_me_url) as response:
                 if response.status == 200:
-                    result = await response.json()
+                    result = orjson.loads(await response.read())
                     if result.get("ok"):
                         bot_info = result.get("result", {})
                         print(f"Telegram bot connected: @{bot_info.get('username', 'unknown')}")
@@ -275,9 +422,10 @@ class TelegramAlerter:
             return False
 
     async def close(self):
-        """Close the aiohttp session"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        """Send any pending alerts; the shared session stays open for other alerters,
+        see close_shared_session()"""
+        if self._pending:
+            await self.flush()
 
 # Example usage and testing
 async def main():
@@ -314,6 +462,7 @@ async def main():
         await alerter.send_daily_summary(test_stats)
     
     await alerter.close()
+    await close_shared_session()
 
 if __name__ == "__main__":
     asyncio.run(main())